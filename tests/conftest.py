@@ -0,0 +1,115 @@
+"""
+Test fixtures: a local HTTP server stands in for the API of a hosted
+service.  It answers with prepared responses, so no request leaves the host.
+"""
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import asyncio
+import json
+import threading
+import time
+
+from pytest import fixture, importorskip
+
+Request = namedtuple('Request', 'method path query params headers body')
+
+
+def reply(status_code=200, data=None, headers=None):
+    """Return a prepared response, with `data` as its JSON body"""
+    return status_code, data, headers or {}
+
+
+class Service:
+    """Answers the requests made to the local server, and records them"""
+
+    def __init__(self, url):
+        self.url = url
+        self.requests = []
+        self.respond = lambda request: reply(404)
+
+    def answer(self, request):
+        self.requests.append(request)
+        return self.respond(request)
+
+    def queue(self, *replies):
+        """Answer the next requests with the replies, in order"""
+        replies = list(replies)
+        self.respond = lambda request: replies.pop(0)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def handle_request(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        request = Request(self.command, url.path, url.query, dict(parse_qsl(url.query)),
+                          self.headers, body)
+        status_code, data, headers = self.server.service.answer(request)
+
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status_code in (204, 304):
+            self.end_headers()
+            return
+        content = json.dumps(data).encode() if data is not None else b''
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+    def log_message(self, format, *args):
+        """Keep the test output clean"""
+
+
+@fixture
+def service():
+    """A local server standing in for the service, on a port of its own"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+    server.daemon_threads = True
+    server.service = Service(f'http://127.0.0.1:{server.server_port}')
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server.service
+    server.shutdown()
+    server.server_close()
+
+
+@fixture(params=['requests', 'httpx', 'urllib3'])
+def client(request):
+    """
+    The options of strategies for sending requests through requests, httpx
+    (with HTTP/2) or a bare urllib3 pool manager
+    """
+    if request.param == 'httpx':
+        importorskip('h2')
+    return {
+        'requests': {},
+        'httpx': {'http2': True},
+        'urllib3': {'pool_manager': True},
+    }[request.param]
+
+
+@fixture(params=[False, True], ids=['aiohttp', 'httpx'])
+def async_http2(request):
+    """Whether asynchronous strategies use httpx (with HTTP/2) instead of aiohttp"""
+    importorskip('h2' if request.param else 'aiohttp')
+    return request.param
+
+
+@fixture
+def sleep(monkeypatch):
+    """Record the waits between retries, instead of waiting"""
+    delays = []
+
+    async def async_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(time, 'sleep', delays.append)
+    monkeypatch.setattr(asyncio, 'sleep', async_sleep)
+    return delays
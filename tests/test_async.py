@@ -0,0 +1,262 @@
+"""
+Tests for the asynchronous strategies and API.
+"""
+import asyncio
+import json
+import time
+
+import requests
+from pytest import importorskip, raises
+
+from versioncontrol.async_base import AsyncServiceAPI
+from versioncontrol.base import ServiceAPI, response_json
+from versioncontrol.github import AsyncGitHubStrategy, GitHubStrategy
+from versioncontrol.gitlab import AsyncGitLabStrategy
+
+from .conftest import reply
+
+
+def github_respond(request):
+    """Answer like GitHub, for the user 'painless'"""
+    if request.path == '/user':
+        return reply(data={'login': 'painless'})
+    *_, project_id, endpoint = request.path.split('/')
+    if project_id == 'broken':
+        return reply(422, data={'message': 'key is already in use'})
+    return reply(201, data={'id': project_id, **json.loads(request.body)})
+
+
+def test_list_projects(service, async_http2):
+    service.queue(reply(data=[{'id': 1}, {'id': 2}]))
+
+    async def list_projects():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            api = AsyncServiceAPI(strategy)
+            await api.list_projects()
+            return api.response
+
+    assert asyncio.run(list_projects()) == [{'id': 1}, {'id': 2}]
+    request, = service.requests
+    assert request.path == '/projects'
+    assert request.headers['Authorization'] == 'Bearer abcdefg1234567'
+
+
+def test_concurrent_requests(service, async_http2):
+    service.respond = lambda request: reply(data={'id': request.path.split('/')[-1]})
+
+    async def project_details(*keys):
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            responses = await asyncio.gather(*(strategy.project_details(key)
+                                               for key in keys))
+            return [response.json() for response in responses]
+
+    assert asyncio.run(project_details('1', '2', '3')) == [{'id': '1'}, {'id': '2'},
+                                                           {'id': '3'}]
+
+
+def test_query_params(service, async_http2):
+    service.queue(reply(201, data={'id': 1}))
+
+    async def create_project():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.create_project('Foo Bar', slug='foo-bar')
+
+    assert asyncio.run(create_project()).status_code == 201
+    request, = service.requests
+    assert request.params['path'] == 'foo-bar'
+    assert request.params['public'] == 'False'
+
+
+def test_redirect_followed(service, async_http2):
+    def respond(request):
+        if request.path == '/projects/old':
+            return reply(301, headers={'Location': f'{service.url}/projects/new'})
+        return reply(data={'path': 'new'})
+    service.respond = respond
+
+    async def project_details(key):
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.project_details(key)
+
+    response = asyncio.run(project_details('old'))
+
+    assert response.status_code == 200
+    assert response_json(response) == {'path': 'new'}
+
+
+def test_delete_project_refused(service, async_http2):
+    service.queue(reply(data={'path': 'other'}))
+
+    async def delete_project():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.delete_project('1', 'foo')
+
+    assert asyncio.run(delete_project()).status_code == 400
+    assert [request.method for request in service.requests] == ['GET']
+
+
+def test_delete_project(service, async_http2):
+    service.queue(reply(data={'path': 'foo'}), reply(202, data={'message': 'Accepted'}))
+
+    async def delete_project():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.delete_project('1', 'foo')
+
+    assert asyncio.run(delete_project()).status_code == 202
+    assert [request.method for request in service.requests] == ['GET', 'DELETE']
+
+
+def test_bulk_add_deploy_key(service, async_http2):
+    service.respond = github_respond
+
+    async def bulk_add_deploy_key(*project_ids):
+        async with AsyncGitHubStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            api = AsyncServiceAPI(strategy)
+            await api.bulk_add_deploy_key(project_ids, 'deploy', 'ssh-rsa AAAA')
+            return api.response
+
+    response = asyncio.run(bulk_add_deploy_key('foo', 'bar', 'baz'))
+
+    assert [details['id'] for details in response] == ['foo', 'bar', 'baz']
+    assert all(details['read_only'] for details in response)
+    paths = {request.path for request in service.requests if request.method == 'POST'}
+    assert paths == {'/repos/painless/foo/keys', '/repos/painless/bar/keys',
+                     '/repos/painless/baz/keys'}
+
+
+def test_bulk_add_deploy_key_concurrency(service, async_http2):
+    in_flight = []
+    most_in_flight = []
+
+    def respond(request):
+        in_flight.append(request)
+        most_in_flight.append(len(in_flight))
+        time.sleep(0.01)
+        in_flight.remove(request)
+        return github_respond(request)
+    service.respond = respond
+
+    async def bulk_add_deploy_key(*project_ids):
+        async with AsyncGitHubStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            api = AsyncServiceAPI(strategy)
+            await api.bulk_add_deploy_key(project_ids, 'deploy', 'ssh-rsa AAAA',
+                                          concurrency=2)
+            return api.response
+
+    response = asyncio.run(bulk_add_deploy_key(*(f'repo{number}' for number in range(8))))
+
+    assert [details['id'] for details in response] == [f'repo{number}' for number in range(8)]
+    assert max(most_in_flight) <= 2
+
+
+def test_bulk_add_deploy_key_concurrency_subclassed(service, async_http2):
+    class SlowServiceAPI(AsyncServiceAPI):
+        BULK_CONCURRENCY = 1
+
+    in_flight = []
+    most_in_flight = []
+
+    def respond(request):
+        in_flight.append(request)
+        most_in_flight.append(len(in_flight))
+        time.sleep(0.01)
+        in_flight.remove(request)
+        return github_respond(request)
+    service.respond = respond
+
+    async def bulk_add_deploy_key(*project_ids):
+        async with AsyncGitHubStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            api = SlowServiceAPI(strategy)
+            await api.bulk_add_deploy_key(project_ids, 'deploy', 'ssh-rsa AAAA')
+            return api.response
+
+    response = asyncio.run(bulk_add_deploy_key(*(f'repo{number}' for number in range(4))))
+
+    assert [details['id'] for details in response] == [f'repo{number}' for number in range(4)]
+    assert max(most_in_flight) == 1
+
+
+def test_bulk_add_deploy_key_failure(service, async_http2):
+    service.respond = github_respond
+
+    async def bulk_add_deploy_key_raises(*project_ids):
+        async with AsyncGitHubStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            api = AsyncServiceAPI(strategy)
+            with raises(requests.HTTPError):
+                await api.bulk_add_deploy_key(project_ids, 'deploy', 'ssh-rsa AAAA')
+            return api.response
+
+    response = asyncio.run(bulk_add_deploy_key_raises('foo', 'broken'))
+
+    assert response[0]['id'] == 'foo'
+    assert response[1] == {'message': 'key is already in use'}
+
+
+def test_async_strategy_settings():
+    class PatientGitHubStrategy(GitHubStrategy):
+        RETRY_ATTEMPTS = 10
+
+    strategy = PatientGitHubStrategy(oauth_token='abcdefg1234567')
+    strategy.base_url = 'https://github.example.com/api/v3'
+    strategy.timeout = 5
+    strategy._username = 'painless'
+
+    async_strategy = strategy.async_strategy()
+
+    assert isinstance(async_strategy, AsyncGitHubStrategy)
+    assert async_strategy.base_url == 'https://github.example.com/api/v3'
+    assert async_strategy.headers['Authorization'] == 'Bearer abcdefg1234567'
+    assert async_strategy.headers['Accept'] == 'application/vnd.github.v3+json'
+    assert 'Connection' not in async_strategy.headers
+    assert async_strategy.timeout == 5
+    assert async_strategy.RETRY_ATTEMPTS == 10
+    assert asyncio.run(async_strategy.username()) == 'painless'
+    assert GitHubStrategy(oauth_token='abcdefg1234567').async_strategy().RETRY_ATTEMPTS == \
+        AsyncGitHubStrategy.RETRY_ATTEMPTS
+
+
+def test_sync_bulk_add_deploy_key(service):
+    importorskip('h2')
+    service.respond = github_respond
+
+    with GitHubStrategy(oauth_token='abcdefg1234567') as strategy:
+        strategy.base_url = service.url
+        assert strategy.username == 'painless'
+        api = ServiceAPI(strategy)
+        api.bulk_add_deploy_key(['foo', 'bar'], 'deploy', 'ssh-rsa AAAA')
+
+    assert [details['id'] for details in api.response] == ['foo', 'bar']
+    assert [request.path for request in service.requests].count('/user') == 1
+
+
+def test_sync_bulk_add_deploy_key_failure(service):
+    importorskip('h2')
+    service.respond = github_respond
+    api = ServiceAPI(GitHubStrategy(oauth_token='abcdefg1234567'))
+    api.strategy.base_url = service.url
+
+    with raises(requests.HTTPError):
+        api.bulk_add_deploy_key(['foo', 'broken'], 'deploy', 'ssh-rsa AAAA')
+
+    assert api.response[1] == {'message': 'key is already in use'}
+    api.strategy.close()
@@ -0,0 +1,677 @@
+"""
+Tests for the generic request handling of the strategies.
+"""
+from email.utils import formatdate
+from urllib.parse import parse_qs
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import requests
+import urllib3
+from pytest import approx, fixture, importorskip, mark, raises
+
+from versioncontrol import base
+from versioncontrol.base import (
+    JSONResponse,
+    dump_json,
+    make_response,
+    rate_limited,
+    requests_error,
+    response_json,
+    retry_delay,
+)
+from versioncontrol.gitlab import AsyncGitLabStrategy, GitLabStrategy
+
+from .conftest import reply
+
+
+class UncachedGitLabStrategy(GitLabStrategy):
+    GET_CACHE_TTL = 0
+
+
+@fixture(params=['json', 'orjson'])
+def json_library(request, monkeypatch):
+    """Encode and decode JSON with the standard library, or with orjson"""
+    if request.param == 'orjson':
+        importorskip('orjson')
+    else:
+        monkeypatch.setattr(base, 'orjson', None)
+    return request.param
+
+
+@fixture
+def gitlab(service, client):
+    with GitLabStrategy(oauth_token='abcdefg1234567', **client) as strategy:
+        strategy.base_url = service.url
+        yield strategy
+
+
+def test_json_response_from_reason():
+    response = JSONResponse.from_reason(status_code=400, reason='Refused.')
+
+    assert JSONResponse.from_reason('Refused.', 400) is response
+    assert JSONResponse.from_reason('Refused.', status_code=400) is response
+    assert JSONResponse.from_reason('Refused.') is not response
+    assert response.status_code == 400
+    assert response_json(response) == {'message': 'Refused.'}
+
+
+def test_dump_json(json_library):
+    content = dump_json({'name': 'Crème Brûlée', 'private': False, 'id': None})
+
+    assert isinstance(content, bytes)
+    assert response_json(make_response(200, content)) == \
+        {'name': 'Crème Brûlée', 'private': False, 'id': None}
+
+
+def test_response_json(json_library):
+    response = make_response(200, '[{"name": "Ærø"}, 1.5, true]'.encode())
+
+    assert response_json(response) == [{'name': 'Ærø'}, 1.5, True]
+
+
+@mark.parametrize('content', [b'', b'{"id": ', b'<html>Bad Gateway</html>'])
+def test_response_json_invalid(json_library, content):
+    with raises(requests.exceptions.JSONDecodeError):
+        response_json(make_response(200, content))
+
+
+def test_get_reuses_cached_response(service, gitlab):
+    service.queue(reply(data={'id': 1}))
+
+    first = gitlab.get('projects', '1')
+    second = gitlab.get('projects', '1')
+
+    assert second is first
+    assert len(service.requests) == 1
+
+
+def test_get_caches_per_query(service, gitlab):
+    service.respond = lambda request: reply(data=[request.params['page']])
+
+    gitlab.get('projects', params={'page': 1})
+    second = gitlab.get('projects', params={'page': 2})
+    third = gitlab.get('projects', params={'page': 1})
+
+    assert response_json(second) == ['2']
+    assert response_json(third) == ['1']
+    assert len(service.requests) == 2
+
+
+
+@mark.parametrize('params, query', [
+    ({'id': [1, 2]}, {'id': ['1', '2']}),
+    ([('a', '1'), ('a', '2')], {'a': ['1', '2']}),
+    ('a=1&b=2', {'a': ['1'], 'b': ['2']}),
+    ({'filter': {'name': 'foo'}}, {'filter': ['name']}),
+    ({'page': 1, 'order_by': 'name'}, {'page': ['1'], 'order_by': ['name']}),
+])
+def test_get_caches_any_params(service, params, query):
+    service.queue(reply(data=[]))
+
+    with GitLabStrategy(oauth_token='abcdefg1234567') as strategy:
+        strategy.base_url = service.url
+        first = strategy.get('projects', params=params)
+        second = strategy.get('projects', params=params)
+
+    assert second is first
+    request, = service.requests
+    assert parse_qs(request.query) == query
+
+def test_get_revalidates_by_etag(service, client):
+    service.queue(reply(data={'id': 1}, headers={'ETag': '"v1"'}), reply(304))
+
+    with UncachedGitLabStrategy(oauth_token='abcdefg1234567', **client) as strategy:
+        strategy.base_url = service.url
+        first = strategy.get('projects', '1')
+        second = strategy.get('projects', '1')
+
+    assert second is first
+    assert response_json(second) == {'id': 1}
+    assert 'If-None-Match' not in service.requests[0].headers
+    assert service.requests[1].headers['If-None-Match'] == '"v1"'
+
+
+def test_get_max_age(service, gitlab):
+    service.queue(reply(data={'id': 1}, headers={'ETag': '"v1"'}), reply(304))
+
+    first = gitlab.get('projects', '1')
+    second = gitlab.get('projects', '1', max_age=0)
+
+    assert second is first
+    assert service.requests[1].headers['If-None-Match'] == '"v1"'
+
+
+def test_get_replaces_modified_response(service, gitlab):
+    service.queue(reply(data={'id': 1}, headers={'ETag': '"v1"'}),
+                  reply(data={'id': 2}, headers={'ETag': '"v2"'}),
+                  reply(304))
+
+    gitlab.get('projects', '1')
+    second = gitlab.get('projects', '1', max_age=0)
+    third = gitlab.get('projects', '1', max_age=0)
+
+    assert response_json(second) == {'id': 2}
+    assert third is second
+    assert service.requests[2].headers['If-None-Match'] == '"v2"'
+
+
+def test_get_without_etag(service, gitlab):
+    service.queue(reply(data={'id': 1}), reply(data={'id': 2}))
+
+    gitlab.get('projects', '1')
+    second = gitlab.get('projects', '1', max_age=0)
+
+    assert response_json(second) == {'id': 2}
+    assert 'If-None-Match' not in service.requests[1].headers
+
+
+def test_get_does_not_cache_errors(service, gitlab):
+    service.queue(reply(404, data={'message': '404 Not Found'}), reply(data={'id': 1}))
+
+    gitlab.get('projects', '1')
+    second = gitlab.get('projects', '1')
+
+    assert second.ok
+    assert len(service.requests) == 2
+
+
+def test_write_invalidates_cache(service, gitlab):
+    service.queue(reply(data={'path': 'old'}),
+                  reply(data={'path': 'new'}),
+                  reply(data={'path': 'new'}))
+
+    gitlab.get('projects', '1')
+    gitlab.update_project('1', slug='new')
+    details = gitlab.get('projects', '1')
+
+    assert response_json(details) == {'path': 'new'}
+    assert [request.method for request in service.requests] == ['GET', 'PUT', 'GET']
+
+
+def test_invalidate_endpoint(service, gitlab):
+    service.respond = lambda request: reply(data={'path': request.path})
+
+    gitlab.get('projects', '1')
+    gitlab.get('user')
+    gitlab.invalidate('projects')
+    gitlab.get('projects', '1')
+    gitlab.get('user')
+
+    assert [request.path for request in service.requests] == \
+        ['/projects/1', '/user', '/projects/1']
+
+
+def test_delete_project_revalidates_details(service, gitlab):
+    service.queue(reply(data={'path': 'old'}, headers={'ETag': '"v1"'}),
+                  reply(data={'path': 'renamed'}, headers={'ETag': '"v2"'}))
+
+    gitlab.project_details('1')
+    response = gitlab.delete_project('1', slug='old')
+
+    assert response.status_code == 400
+    assert [request.method for request in service.requests] == ['GET', 'GET']
+    assert service.requests[1].headers['If-None-Match'] == '"v1"'
+
+
+def test_delete_project(service, gitlab):
+    service.queue(reply(data={'path': 'old'}, headers={'ETag': '"v1"'}),
+                  reply(304),
+                  reply(202, data={'message': '202 Accepted'}))
+
+    gitlab.project_details('1')
+    response = gitlab.delete_project('1', slug='old')
+
+    assert response.status_code == 202
+    assert [request.method for request in service.requests] == ['GET', 'GET', 'DELETE']
+
+
+def test_redirect_followed(service, gitlab):
+    def respond(request):
+        if request.path == '/projects/old':
+            return reply(301, headers={'Location': f'{service.url}/projects/new'})
+        return reply(data={'path': 'new'})
+    service.respond = respond
+
+    response = gitlab.project_details('old')
+
+    assert response.status_code == 200
+    assert response_json(response) == {'path': 'new'}
+
+
+def test_retry_after(service, gitlab, sleep):
+    service.queue(reply(503, headers={'Retry-After': '3'}), reply(data={'id': 1}))
+
+    response = gitlab.get('projects', '1')
+
+    assert response.ok
+    assert sleep == [3]
+
+
+
+def test_retry_after_http_date():
+    retry_after = formatdate(time.time() + 30, usegmt=True)
+    response = make_response(503, b'', headers={'Retry-After': retry_after})
+
+    assert retry_delay(response, 0, 0.5, 10) == approx(30, abs=1)
+
+
+def test_retry_after_past_http_date():
+    retry_after = formatdate(time.time() - 30, usegmt=True)
+    response = make_response(503, b'', headers={'Retry-After': retry_after})
+
+    assert retry_delay(response, 0, 0.5, 10) == 0
+
+
+def test_retry_after_invalid():
+    response = make_response(503, b'', headers={'Retry-After': 'soon'})
+
+    assert 0.25 <= retry_delay(response, 0, 0.5, 10) <= 0.5
+
+
+def test_retry_until_rate_limit_reset():
+    reset = int(time.time()) + 60
+    response = make_response(403, b'', headers={'X-RateLimit-Remaining': '0',
+                                                'X-RateLimit-Reset': str(reset)})
+
+    assert retry_delay(response, 0, 0.5, 10) == approx(60, abs=1)
+
+
+
+def test_rate_limit_reset_too_late(service, gitlab, sleep):
+    reset = int(time.time()) + 3600
+    service.queue(reply(403, data={'message': 'API rate limit exceeded'},
+                        headers={'X-RateLimit-Remaining': '0',
+                                 'X-RateLimit-Reset': str(reset)}))
+
+    response = gitlab.get('projects', '1')
+
+    assert response.status_code == 403
+    assert len(service.requests) == 1
+    assert sleep == []
+
+
+def test_retry_after_too_long(service, gitlab, sleep):
+    service.queue(reply(429, headers={'Retry-After': '86400'}))
+
+    response = gitlab.create_project('Foo', slug='foo')
+
+    assert response.status_code == 429
+    assert len(service.requests) == 1
+    assert sleep == []
+
+@mark.parametrize('status_code, headers, limited', [
+    (429, {}, True),
+    (403, {'Retry-After': '60'}, True),
+    (403, {'X-RateLimit-Remaining': '0'}, True),
+    (403, {'X-RateLimit-Remaining': '4999'}, False),
+    (403, {}, False),
+    (503, {'Retry-After': '60'}, False),
+])
+def test_rate_limited(status_code, headers, limited):
+    assert rate_limited(make_response(status_code, b'', headers=headers)) is limited
+
+@mark.parametrize('attempt', range(6))
+def test_retry_backoff(attempt):
+    delay = min(0.5 * 2 ** attempt, 10)
+
+    assert delay / 2 <= retry_delay(make_response(503, b''), attempt, 0.5, 10) <= delay
+
+
+def test_retry_backoff_without_response():
+    assert 0.5 <= retry_delay(None, 1, 0.5, 10) <= 1
+
+
+def test_retry_idempotent(service, gitlab, sleep):
+    service.queue(reply(502), reply(504), reply(200, data={'id': 1}))
+
+    response = gitlab.update_project('1', slug='foo')
+
+    assert response.ok
+    assert [request.method for request in service.requests] == ['PUT', 'PUT', 'PUT']
+    assert len(sleep) == 2
+
+
+def test_post_not_retried_after_server_error(service, gitlab, sleep):
+    service.queue(reply(503), reply(201, data={'id': 1}))
+
+    response = gitlab.create_project('Foo', slug='foo')
+
+    assert response.status_code == 503
+    assert len(service.requests) == 1
+    assert sleep == []
+
+
+def test_post_retried_when_rate_limited(service, gitlab, sleep):
+    service.queue(reply(429, headers={'Retry-After': '1'}), reply(201, data={'id': 1}))
+
+    response = gitlab.create_project('Foo', slug='foo')
+
+    assert response.status_code == 201
+    assert len(service.requests) == 2
+    assert sleep == [1]
+
+
+
+def test_post_retried_when_rate_limited_by_github(service, gitlab, sleep):
+    service.queue(reply(403, data={'message': 'API rate limit exceeded'},
+                        headers={'X-RateLimit-Remaining': '0', 'Retry-After': '2'}),
+                  reply(201, data={'id': 1}))
+
+    response = gitlab.create_project('Foo', slug='foo')
+
+    assert response.status_code == 201
+    assert sleep == [2]
+
+
+def test_forbidden_not_retried(service, gitlab, sleep):
+    service.queue(reply(403, data={'message': '403 Forbidden'},
+                        headers={'X-RateLimit-Remaining': '42'}))
+
+    assert gitlab.get('projects', '1').status_code == 403
+    assert len(service.requests) == 1
+
+def test_client_error_not_retried(service, gitlab, sleep):
+    service.queue(reply(404, data={'message': '404 Not Found'}))
+
+    assert gitlab.get('projects', '1').status_code == 404
+    assert len(service.requests) == 1
+
+
+def test_retries_give_up(service, gitlab, sleep):
+    service.respond = lambda request: reply(503)
+
+    response = gitlab.get('projects', '1')
+
+    assert response.status_code == 503
+    assert len(service.requests) == gitlab.RETRY_ATTEMPTS
+    assert len(sleep) == gitlab.RETRY_ATTEMPTS - 1
+
+
+def test_async_retry(service, async_http2, sleep):
+    service.queue(reply(429, headers={'Retry-After': '2'}), reply(201, data={'id': 1}))
+
+    async def create_project():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.create_project('Foo', slug='foo')
+
+    assert asyncio.run(create_project()).status_code == 201
+    assert sleep == [2]
+
+
+
+def test_async_retry_after_too_long(service, async_http2, sleep):
+    service.queue(reply(429, headers={'Retry-After': '86400'}))
+
+    async def create_project():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.create_project('Foo', slug='foo')
+
+    assert asyncio.run(create_project()).status_code == 429
+    assert sleep == []
+
+def test_async_post_not_retried_after_server_error(service, async_http2, sleep):
+    service.queue(reply(503), reply(201, data={'id': 1}))
+
+    async def create_project():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.create_project('Foo', slug='foo')
+
+    assert asyncio.run(create_project()).status_code == 503
+    assert len(service.requests) == 1
+
+
+def test_session_per_thread():
+    strategy = GitLabStrategy(oauth_token='abcdefg1234567')
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(strategy.session))
+    thread.start()
+    thread.join()
+
+    assert strategy.session is strategy.session
+    assert sessions[0] is not strategy.session
+    strategy.headers['X-Test'] = 'shared'
+    assert sessions[0].headers['X-Test'] == strategy.session.headers['X-Test'] == 'shared'
+    strategy.close()
+
+
+
+def test_session_default_headers(service):
+    service.queue(reply(data={'id': 1}))
+
+    with GitLabStrategy(oauth_token='abcdefg1234567') as strategy:
+        strategy.base_url = service.url
+        strategy.get('projects', '1')
+
+    request, = service.requests
+    assert 'gzip' in request.headers['Accept-Encoding']
+    assert request.headers['User-Agent'].startswith('python-requests/')
+    assert request.headers['Authorization'] == 'Bearer abcdefg1234567'
+
+
+def test_http2_client_shared():
+    importorskip('h2')
+    strategy = GitLabStrategy(oauth_token='abcdefg1234567', http2=True)
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(strategy.session))
+    thread.start()
+    thread.join()
+
+    assert sessions[0] is strategy.session
+    strategy.close()
+
+
+def test_close(service):
+    service.respond = lambda request: reply(data=[request.params['page']],
+                                            headers={'X-Total-Pages': '3'})
+    strategy = GitLabStrategy(oauth_token='abcdefg1234567')
+    strategy.base_url = service.url
+
+    strategy.list_projects(per_page=1)
+    session = strategy.session
+    pool_manager = session.get_adapter(service.url).poolmanager
+    assert pool_manager.pools
+    strategy.close()
+
+    assert not pool_manager.pools
+    assert strategy.session is not session
+    strategy.invalidate()
+    assert response_json(strategy.list_projects(per_page=1)) == ['1', '2', '3']
+    strategy.close()
+
+
+
+def test_get_pages_concurrency(service):
+    in_flight = []
+    most_in_flight = []
+    lock = threading.Lock()
+
+    def respond(request):
+        with lock:
+            in_flight.append(request)
+            most_in_flight.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(request)
+        return reply(data=[request.params['page']])
+    service.respond = respond
+
+    with GitLabStrategy(oauth_token='abcdefg1234567') as strategy:
+        strategy.base_url = service.url
+        results = {}
+
+        def get_pages(concurrency):
+            responses = strategy.get_pages('projects', pages=range(1, 13),
+                                           params={'concurrency': concurrency},
+                                           concurrency=concurrency)
+            results[concurrency] = [response_json(response)[0] for response in responses]
+
+        threads = [threading.Thread(target=get_pages, args=(concurrency,))
+                   for concurrency in (1, 3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert results == {1: [str(page) for page in range(1, 13)],
+                       3: [str(page) for page in range(1, 13)]}
+    assert max(most_in_flight) <= 1 + 3
+
+
+def test_get_pages_concurrency_subclassed(service):
+    class SlowGitLabStrategy(GitLabStrategy):
+        PAGE_CONCURRENCY = 1
+
+    in_flight = []
+    most_in_flight = []
+    lock = threading.Lock()
+
+    def respond(request):
+        with lock:
+            in_flight.append(request)
+            most_in_flight.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(request)
+        return reply(data=[request.params['page']])
+    service.respond = respond
+
+    with SlowGitLabStrategy(oauth_token='abcdefg1234567') as strategy:
+        strategy.base_url = service.url
+        responses = strategy.get_pages('projects', pages=range(1, 7))
+
+    assert [response_json(response)[0] for response in responses] == \
+        [str(page) for page in range(1, 7)]
+    assert max(most_in_flight) == 1
+
+
+def test_executor_kept(service):
+    service.respond = lambda request: reply(data=[request.params['page']])
+
+    with GitLabStrategy(oauth_token='abcdefg1234567') as strategy:
+        strategy.base_url = service.url
+        executor = strategy.executor
+        strategy.get_pages('projects', pages=range(1, 4), concurrency=2)
+        strategy.get_pages('user', pages=range(1, 4), concurrency=5)
+
+        assert strategy.executor is executor
+
+
+def test_requests_from_worker_threads(service, gitlab):
+    service.respond = lambda request: reply(data=[request.params['page']],
+                                            headers={'X-Total-Pages': '4'})
+
+    gitlab.list_projects(per_page=1)
+
+    assert len(service.requests) == 4
+    assert all(request.headers['Authorization'] == 'Bearer abcdefg1234567'
+               for request in service.requests)
+
+
+@fixture
+def pooled_gitlab(service):
+    with GitLabStrategy(oauth_token='abcdefg1234567', pool_manager=True) as strategy:
+        strategy.base_url = service.url
+        yield strategy
+
+
+def test_urlopen_params(service, pooled_gitlab):
+    service.queue(reply(data=[]))
+
+    pooled_gitlab.get('projects', params={'search': 'foo bar', 'archived': False,
+                                          'owned': None, 'per_page': 20})
+
+    request, = service.requests
+    assert request.path == '/projects'
+    assert request.params == {'search': 'foo bar', 'archived': 'False', 'per_page': '20'}
+
+
+def test_urlopen_json(service, pooled_gitlab):
+    service.queue(reply(201, data={'id': 1}))
+
+    response = pooled_gitlab.post('projects', json={'name': 'Crème', 'public': False})
+
+    assert response_json(response) == {'id': 1}
+    request, = service.requests
+    assert request.headers['Content-Type'] == 'application/json'
+    assert json.loads(request.body) == {'name': 'Crème', 'public': False}
+
+
+def test_urlopen_data(service, pooled_gitlab):
+    service.queue(reply(201, data={'id': 1}))
+
+    pooled_gitlab.post('projects', data=b'name=foo',
+                       headers={'Content-Type': 'application/x-www-form-urlencoded'})
+
+    request, = service.requests
+    assert request.body == b'name=foo'
+    assert request.headers['Content-Type'] == 'application/x-www-form-urlencoded'
+    assert request.headers['Authorization'] == 'Bearer abcdefg1234567'
+
+
+def test_urlopen_response(service, pooled_gitlab):
+    service.queue(reply(404, data={'message': '404 Not Found'}, headers={'X-Test': '1'}))
+
+    response = pooled_gitlab.get('projects', '1')
+
+    assert response.status_code == 404
+    assert response.reason == 'Not Found'
+    assert response.headers['x-test'] == '1'
+    assert response.url == f'{service.url}/projects/1'
+    assert response_json(response) == {'message': '404 Not Found'}
+
+
+def test_urlopen_accept_encoding(service, pooled_gitlab):
+    service.queue(reply(data=[]))
+
+    pooled_gitlab.get('projects')
+
+    request, = service.requests
+    assert 'gzip' in request.headers['Accept-Encoding']
+
+
+def test_urlopen_connection_error():
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port = unused.getsockname()[1]
+
+    with GitLabStrategy(oauth_token='abcdefg1234567', pool_manager=True) as strategy:
+        strategy.base_url = f'http://127.0.0.1:{port}'
+        with raises(requests.ConnectionError):
+            strategy.get('projects')
+
+
+@mark.parametrize('error, expected', [
+    (urllib3.exceptions.MaxRetryError(
+        None, '/', urllib3.exceptions.NewConnectionError(None, 'refused')),
+     requests.exceptions.ConnectionError),
+    (urllib3.exceptions.MaxRetryError(
+        None, '/', urllib3.exceptions.ConnectTimeoutError('timed out')),
+     requests.exceptions.ConnectTimeout),
+    (urllib3.exceptions.MaxRetryError(
+        None, '/', urllib3.exceptions.ReadTimeoutError(None, '/', 'timed out')),
+     requests.exceptions.ReadTimeout),
+    (urllib3.exceptions.MaxRetryError(
+        None, '/', urllib3.exceptions.ResponseError('too many 502 error responses')),
+     requests.exceptions.RetryError),
+    (urllib3.exceptions.MaxRetryError(None, '/', urllib3.exceptions.SSLError('bad')),
+     requests.exceptions.SSLError),
+    (urllib3.exceptions.MaxRetryError(None, '/'), requests.exceptions.ConnectionError),
+    (urllib3.exceptions.ReadTimeoutError(None, '/', 'timed out'),
+     requests.exceptions.ReadTimeout),
+    (urllib3.exceptions.TimeoutError('timed out'), requests.exceptions.Timeout),
+    (urllib3.exceptions.ProtocolError('Connection aborted.'),
+     requests.exceptions.ConnectionError),
+])
+def test_requests_error(error, expected):
+    assert type(requests_error(error)) is expected
@@ -0,0 +1,386 @@
+"""
+Tests for fetching and joining the pages of project lists.
+"""
+import asyncio
+import json
+import time
+
+import requests
+from pytest import fixture, importorskip, raises
+
+from versioncontrol.base import iter_json_items, join_pages, make_response, page_of_url
+from versioncontrol.bitbucket import BitbucketStrategy
+from versioncontrol.github import GitHubStrategy
+from versioncontrol.gitlab import AsyncGitLabStrategy, GitLabStrategy
+
+from .conftest import reply
+
+
+def json_response(data, status_code=200, headers=None):
+    """Return a response with a JSON body"""
+    return make_response(status_code, json.dumps(data).encode(), headers=headers)
+
+
+@fixture
+def gitlab(service, client):
+    with GitLabStrategy(oauth_token='abcdefg1234567', **client) as strategy:
+        strategy.base_url = service.url
+        yield strategy
+
+
+@fixture
+def github(service, client):
+    with GitHubStrategy(oauth_token='abcdefg1234567', **client) as strategy:
+        strategy.base_url = service.url
+        yield strategy
+
+
+@fixture
+def bitbucket(service, client):
+    with BitbucketStrategy(oauth_token='abcdefg1234567', **client) as strategy:
+        strategy.base_url = service.url
+        yield strategy
+
+
+def gitlab_pages(total, last_page_known=True, failing_page=None):
+    """Answer like GitLab, with one project per page"""
+    def respond(request):
+        page = int(request.params['page'])
+        if page == failing_page:
+            return reply(404, data={'message': '404 Not Found'})
+        headers = {'X-Next-Page': str(page + 1) if page < total else ''}
+        if last_page_known:
+            headers['X-Total-Pages'] = str(total)
+        return reply(data=[{'id': page}], headers=headers)
+    return respond
+
+
+def github_pages(url, total):
+    """Answer like GitHub, with one repository per page"""
+    def respond(request):
+        page = int(request.params['page'])
+        links = []
+        if page < total:
+            links.append(f'<{url}/user/repos?per_page=1&page={page + 1}>; rel="next"')
+            links.append(f'<{url}/user/repos?per_page=1&page={total}>; rel="last"')
+        headers = {'Link': ', '.join(links)} if links else {}
+        return reply(data=[{'name': f'repo{page}'}], headers=headers)
+    return respond
+
+
+def bitbucket_pages(url, total, size_known=True):
+    """Answer like Bitbucket, with one repository per page"""
+    def respond(request):
+        if request.path == '/user':
+            return reply(data={'username': 'painless'})
+        page = int(request.params['page'])
+        data = {'values': [{'name': f'repo{page}'}], 'pagelen': 1, 'page': page}
+        if size_known:
+            data['size'] = total
+        if page < total:
+            data['next'] = f'{url}/repositories/painless?pagelen=1&page={page + 1}'
+        return reply(data=data)
+    return respond
+
+
+def bitbucket_items(url, names, pagelen):
+    """Answer like Bitbucket, listing the repositories `names`"""
+    def respond(request):
+        if request.path == '/user':
+            return reply(data={'username': 'painless'})
+        page = int(request.params['page'])
+        data = {'values': [{'name': name}
+                           for name in names[(page - 1) * pagelen:page * pagelen]]}
+        if page * pagelen < len(names):
+            data['next'] = f'{url}/repositories/painless?pagelen={pagelen}&page={page + 1}'
+        return reply(data=data)
+    return respond
+
+
+def test_page_of_url():
+    assert page_of_url('https://api.github.com/user/repos?per_page=2&page=3') == 3
+    assert page_of_url('https://api.github.com/user/repos?per_page=2') is None
+    assert page_of_url(None) is None
+
+
+def test_join_pages():
+    responses = [json_response([1, 2]), json_response([3]), json_response([])]
+
+    assert join_pages(responses).json() == [1, 2, 3]
+
+
+def test_join_pages_by_key():
+    responses = [json_response({'values': [1, 2], 'next': 'https://x/?page=2'}),
+                 json_response({'values': [3]})]
+
+    assert join_pages(responses, key='values').json() == {'values': [1, 2, 3]}
+
+
+def test_join_pages_headers():
+    first = json_response([1], headers={
+        'Link': '<https://x/?page=2>; rel="next", <https://x/?page=2>; rel="last"',
+        'X-Next-Page': '2', 'X-Total-Pages': '2', 'X-Total': '2', 'Content-Length': '3',
+        'Content-Type': 'application/json'})
+
+    response = join_pages([first, json_response([2])])
+
+    assert response.links == {}
+    assert 'X-Next-Page' not in response.headers
+    assert 'X-Total-Pages' not in response.headers
+    assert 'Content-Length' not in response.headers
+    assert response.headers['X-Total'] == '2'
+    assert response.headers['Content-Type'] == 'application/json'
+
+
+def test_join_pages_single():
+    first = json_response([1])
+
+    assert join_pages([first]) is first
+
+
+def test_join_pages_failure():
+    failure = json_response({'message': 'Bad Gateway'}, status_code=502)
+
+    assert join_pages([json_response([1]), failure, json_response([3])]) is failure
+
+
+def test_gitlab_total_pages(service, gitlab):
+    service.respond = gitlab_pages(5)
+
+    response = gitlab.list_projects(per_page=1)
+
+    assert response.json() == [{'id': page} for page in range(1, 6)]
+    assert sorted(int(request.params['page']) for request in service.requests) == \
+        [1, 2, 3, 4, 5]
+    assert all(request.params['per_page'] == '1' for request in service.requests)
+    assert all(request.params['membership'] == 'True' for request in service.requests)
+
+
+def test_gitlab_next_page(service, gitlab):
+    service.respond = gitlab_pages(3, last_page_known=False)
+
+    response = gitlab.list_projects(per_page=1)
+
+    assert response.json() == [{'id': 1}, {'id': 2}, {'id': 3}]
+    assert [request.params['page'] for request in service.requests] == ['1', '2', '3']
+
+
+def test_gitlab_next_page_failure(service, gitlab):
+    service.respond = gitlab_pages(3, last_page_known=False, failing_page=2)
+
+    response = gitlab.list_projects(per_page=1)
+
+    assert response.status_code == 404
+    assert [request.params['page'] for request in service.requests] == ['1', '2']
+
+
+def test_gitlab_page_failure(service, gitlab):
+    service.respond = gitlab_pages(3, failing_page=3)
+
+    assert gitlab.list_projects(per_page=1).status_code == 404
+
+
+def test_gitlab_first_page_failure(service, gitlab):
+    service.queue(reply(401, data={'message': '401 Unauthorized'}))
+
+    assert gitlab.list_projects().status_code == 401
+    assert len(service.requests) == 1
+
+
+def test_github_last_page(service, github):
+    service.respond = github_pages(service.url, 4)
+
+    response = github.list_projects(per_page=1)
+
+    assert response.json() == [{'name': f'repo{page}'} for page in range(1, 5)]
+
+
+def test_github_single_page(service, github):
+    service.respond = github_pages(service.url, 1)
+
+    assert github.list_projects().json() == [{'name': 'repo1'}]
+    assert len(service.requests) == 1
+
+
+def test_bitbucket_size(service, bitbucket):
+    service.respond = bitbucket_pages(service.url, 3)
+
+    response = bitbucket.list_projects(per_page=1)
+
+    assert [repo['name'] for repo in response.json()['values']] == ['repo1', 'repo2', 'repo3']
+    assert 'next' not in response.json()
+
+
+def test_bitbucket_next(service, bitbucket):
+    service.respond = bitbucket_pages(service.url, 3, size_known=False)
+
+    response = bitbucket.list_projects(per_page=1)
+
+    assert [repo['name'] for repo in response.json()['values']] == ['repo1', 'repo2', 'repo3']
+    pages = [request.params['page'] for request in service.requests if request.params]
+    assert pages == ['1', '2', '3']
+
+
+def test_async_gitlab_total_pages(service, async_http2):
+    service.respond = gitlab_pages(5)
+
+    async def list_projects():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.list_projects(per_page=1, concurrency=2)
+
+    response = asyncio.run(list_projects())
+
+    assert response.json() == [{'id': page} for page in range(1, 6)]
+    assert all(request.params['membership'] == 'True' for request in service.requests)
+
+
+def test_async_gitlab_next_page(service, async_http2):
+    service.respond = gitlab_pages(3, last_page_known=False)
+
+    async def list_projects():
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567',
+                                       http2=async_http2) as strategy:
+            strategy.base_url = service.url
+            return await strategy.list_projects(per_page=1)
+
+    response = asyncio.run(list_projects())
+
+    assert response.json() == [{'id': 1}, {'id': 2}, {'id': 3}]
+
+
+def test_iter_json_items():
+    importorskip('ijson')
+    chunks = [b'{"values": [{"na', b'me": "a"}, {"name": "b"}', b'], "next": null}']
+
+    items = iter_json_items(iter(chunks), prefix='values.item')
+
+    assert list(items) == [{'name': 'a'}, {'name': 'b'}]
+
+
+def test_gitlab_iter_projects(service, gitlab):
+    importorskip('ijson')
+    service.respond = gitlab_pages(3)
+
+    projects = gitlab.iter_projects(per_page=1)
+
+    assert list(projects) == [{'id': 1}, {'id': 2}, {'id': 3}]
+    assert [request.params['page'] for request in service.requests] == ['1', '2', '3']
+    assert all(request.params['membership'] == 'True' for request in service.requests)
+
+
+def test_gitlab_iter_projects_lazily(service, gitlab):
+    importorskip('ijson')
+    service.respond = gitlab_pages(3)
+
+    projects = gitlab.iter_projects(per_page=1)
+    assert next(projects) == {'id': 1}
+    projects.close()
+
+    assert len(service.requests) == 1
+
+
+def test_gitlab_iter_projects_failure(service, gitlab):
+    importorskip('ijson')
+    service.respond = gitlab_pages(3, failing_page=2)
+
+    projects = gitlab.iter_projects(per_page=1)
+
+    assert next(projects) == {'id': 1}
+    with raises(requests.HTTPError):
+        next(projects)
+
+
+def test_gitlab_iter_projects_rate_limited(service, gitlab, sleep):
+    importorskip('ijson')
+    pages = gitlab_pages(3)
+    limited = []
+
+    def respond(request):
+        if request.params['page'] == '2' and not limited:
+            limited.append(request)
+            return reply(429, data={'message': '429 Too Many Requests'},
+                         headers={'Retry-After': '2'})
+        return pages(request)
+    service.respond = respond
+
+    projects = gitlab.iter_projects(per_page=1)
+
+    assert list(projects) == [{'id': 1}, {'id': 2}, {'id': 3}]
+    assert [request.params['page'] for request in service.requests] == ['1', '2', '2', '3']
+    assert sleep == [2]
+
+
+def test_github_iter_projects_rate_limited(service, github, sleep):
+    importorskip('ijson')
+    pages = github_pages(service.url, 2)
+    reset = int(time.time()) + 2
+    limited = []
+
+    def respond(request):
+        if not limited:
+            limited.append(request)
+            return reply(403, data={'message': 'API rate limit exceeded'},
+                         headers={'X-RateLimit-Remaining': '0',
+                                  'X-RateLimit-Reset': str(reset)})
+        return pages(request)
+    service.respond = respond
+
+    projects = github.iter_projects(per_page=1)
+
+    assert [project['name'] for project in projects] == ['repo1', 'repo2']
+    assert [request.params['page'] for request in service.requests] == ['1', '1', '2']
+    assert len(sleep) == 1
+
+
+def test_github_iter_projects_rate_limit_reset_too_late(service, github, sleep):
+    importorskip('ijson')
+    reset = int(time.time()) + 3600
+    service.queue(reply(403, data={'message': 'API rate limit exceeded'},
+                        headers={'X-RateLimit-Remaining': '0',
+                                 'X-RateLimit-Reset': str(reset)}))
+
+    with raises(requests.HTTPError):
+        list(github.iter_projects(per_page=1))
+    assert sleep == []
+
+
+def test_github_iter_projects(service, github):
+    importorskip('ijson')
+    service.respond = github_pages(service.url, 3)
+
+    projects = github.iter_projects(per_page=1)
+
+    assert [project['name'] for project in projects] == ['repo1', 'repo2', 'repo3']
+
+
+def test_bitbucket_iter_projects(service, bitbucket):
+    importorskip('ijson')
+    service.respond = bitbucket_items(service.url, ['a', 'b', 'c', 'd', 'e'], pagelen=2)
+
+    projects = bitbucket.iter_projects(per_page=2)
+
+    assert [project['name'] for project in projects] == ['a', 'b', 'c', 'd', 'e']
+    # the short third page ends the list, without asking for a fourth
+    pages = [request.params['page'] for request in service.requests if request.params]
+    assert pages == ['1', '2', '3']
+
+
+def test_bitbucket_iter_projects_full_pages(service, bitbucket):
+    importorskip('ijson')
+    service.respond = bitbucket_items(service.url, ['a', 'b', 'c', 'd'], pagelen=2)
+
+    projects = bitbucket.iter_projects(per_page=2)
+
+    assert [project['name'] for project in projects] == ['a', 'b', 'c', 'd']
+    pages = [request.params['page'] for request in service.requests if request.params]
+    assert pages == ['1', '2', '3']
+
+
+def test_bitbucket_iter_projects_pagelen(service, bitbucket):
+    importorskip('ijson')
+    service.respond = bitbucket_items(service.url, ['a'], pagelen=100)
+
+    assert [project['name'] for project in bitbucket.iter_projects(per_page=500)] == ['a']
+    assert service.requests[-1].params['pagelen'] == '100'
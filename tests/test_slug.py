@@ -0,0 +1,34 @@
+"""
+Tests for computing slugs of project names.
+"""
+from pytest import importorskip, mark
+
+from versioncontrol._slug import slugify
+
+NAMES = [
+    ('Hello World', 'hello-world'),
+    ('  Hello   World  ', 'hello-world'),
+    ('Crème Brûlée', 'creme-brulee'),
+    ('Ærøskøbing', 'rskbing'),
+    ('snake_case_name', 'snake_case_name'),
+    ('_leading and trailing_', 'leading-and-trailing'),
+    ('many---hyphens - and - spaces', 'many-hyphens-and-spaces'),
+    ('-hyphens-around-', 'hyphens-around'),
+    ('Ümlaut & Co. (2024)!', 'umlaut-co-2024'),
+    ('tab\tand\nnewline', 'tab-and-newline'),
+    ('日本語', ''),
+    ('', ''),
+    (2024, '2024'),
+]
+
+
+@mark.parametrize('name, slug', NAMES)
+def test_slugify(name, slug):
+    assert slugify(name) == slug
+
+
+@mark.parametrize('name, slug', NAMES)
+def test_slugify_like_django(name, slug):
+    text = importorskip('django.utils.text')
+
+    assert slugify(name) == text.slugify(name)
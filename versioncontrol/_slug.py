@@ -0,0 +1,19 @@
+"""
+Slug computation for project names, without depending on Django.
+"""
+from functools import lru_cache
+
+import re
+import unicodedata
+
+
+@lru_cache(maxsize=1024)
+def slugify(name):
+    """
+    Convert a name to ASCII, lowercase it, remove characters that aren't
+    alphanumerics, underscores or hyphens, and convert spaces and repeated
+    hyphens to single hyphens.  Behaves like Django's ``slugify`` filter.
+    """
+    value = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    value = re.sub(r'[^\w\s-]', '', value.lower())
+    return re.sub(r'[-\s]+', '-', value).strip('-_')
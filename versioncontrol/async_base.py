@@ -0,0 +1,370 @@
+"""
+Generic asynchronous API access implementation for a version control system
+service.  Requires aiohttp, or httpx for HTTP/2.
+"""
+from functools import lru_cache
+from typing import Protocol
+
+import asyncio
+
+from .base import (
+    ServiceAPIStrategy,
+    ServiceRequestsMixin,
+    httpx_arguments,
+    httpx_response,
+    make_response,
+    query_params,
+    response_json,
+    retry_delay,
+)
+
+SHARED_TUNABLES = ('PAGE_CONCURRENCY', 'RETRY_ATTEMPTS', 'RETRY_STATUSES', 'RETRY_BACKOFF',
+                   'RETRY_BACKOFF_MAX', 'RETRY_AFTER_MAX', 'IDEMPOTENT_METHODS')
+CLIENT_HEADERS = {'accept-encoding', 'connection', 'user-agent'}
+
+
+@lru_cache(maxsize=None)
+def tuned_strategy_class(async_class, strategy_class):
+    """
+    Return a subclass of an asynchronous strategy class taking over the
+    tunables changed in a synchronous strategy class, or the class itself
+    when there are none.
+    """
+    tunables = {name: getattr(strategy_class, name) for name in SHARED_TUNABLES
+                if getattr(strategy_class, name) != getattr(async_class, name)}
+    if strategy_class.MAX_RETRIES.total != async_class.CONNECT_RETRIES:
+        tunables['CONNECT_RETRIES'] = strategy_class.MAX_RETRIES.total
+    if not tunables:
+        return async_class
+    return type(async_class.__name__, (async_class,), {'__slots__': (), **tunables})
+
+
+class AsyncServiceRequestsMixin:
+    """
+    A collection of coroutines for making HTTP request calls against a REST API
+
+    Requests are made through an aiohttp client session, or through an httpx
+    client with HTTP/2 support when `http2` is set (requires ``httpx[http2]``).
+
+    Like with ``ServiceRequestsMixin``, the tunables in upper case are class
+    attributes, read-only on instances; set them by subclassing.
+    """
+    __slots__ = ('base_url', 'headers', 'timeout', 'http2', '_session')
+
+    CONNECTION_LIMIT = 20
+    KEEPALIVE_TIMEOUT = 60  # seconds
+    CONNECT_RETRIES = ServiceRequestsMixin.MAX_RETRIES.total
+    PAGE_CONCURRENCY = ServiceRequestsMixin.PAGE_CONCURRENCY
+    RETRY_ATTEMPTS = ServiceRequestsMixin.RETRY_ATTEMPTS
+    RETRY_STATUSES = ServiceRequestsMixin.RETRY_STATUSES
+    RETRY_BACKOFF = ServiceRequestsMixin.RETRY_BACKOFF
+    RETRY_BACKOFF_MAX = ServiceRequestsMixin.RETRY_BACKOFF_MAX
+    RETRY_AFTER_MAX = ServiceRequestsMixin.RETRY_AFTER_MAX
+    IDEMPOTENT_METHODS = ServiceRequestsMixin.IDEMPOTENT_METHODS
+
+    url_for_endpoint = ServiceRequestsMixin.url_for_endpoint
+    should_retry = ServiceRequestsMixin.should_retry
+
+    def __init__(self, base_url, headers, timeout, http2=False):
+        """Just a mixin, initialized in AsyncServiceAPIStrategy constructor"""
+        self.base_url = base_url
+        self.headers = headers
+        self.timeout = timeout
+        self.http2 = http2
+        self._session = None
+
+    @property
+    def session(self):
+        """The client session, created lazily inside the running event loop"""
+        if self._session is None and self.http2:
+            import httpx
+
+            limits = httpx.Limits(max_connections=self.CONNECTION_LIMIT,
+                                  keepalive_expiry=self.KEEPALIVE_TIMEOUT)
+            transport = httpx.AsyncHTTPTransport(http1=True, http2=True, limits=limits,
+                                                 retries=self.CONNECT_RETRIES)
+            self._session = httpx.AsyncClient(headers=self.headers, timeout=self.timeout,
+                                              transport=transport, follow_redirects=True)
+        elif self._session is None:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(limit=self.CONNECTION_LIMIT,
+                                             keepalive_timeout=self.KEEPALIVE_TIMEOUT)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    @property
+    def connection_errors(self):
+        """The exceptions on which idempotent requests are retried"""
+        if self.http2:
+            return ()  # retried by the httpx transport already
+        import aiohttp
+
+        return aiohttp.ClientConnectionError
+
+    async def close(self):
+        """Release the pooled connections of the client session"""
+        if self._session is not None and self.http2:
+            await self._session.aclose()
+        elif self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    async def get_json_or_raise(self, endpoint, *args, **kwargs):
+        """Make a GET request, ensure it was successful, and return JSON"""
+        response = await self.get(endpoint, *args, **kwargs)
+        response.raise_for_status()
+        return response_json(response)
+
+    async def get_pages(self, endpoint, *args, pages, params=None, concurrency=None):
+        """Make GET requests for several pages of a list endpoint concurrently
+
+        At most `concurrency` (by default PAGE_CONCURRENCY) requests are in
+        flight at a time.  Returns the responses in the order of `pages`.
+        """
+        params = params or {}
+        if concurrency is None:
+            concurrency = self.PAGE_CONCURRENCY
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def get_page(page):
+            async with semaphore:
+                return await self.get(endpoint, *args, params={**params, 'page': page})
+
+        return await asyncio.gather(*(get_page(page) for page in pages))
+
+    async def get_next_pages(self, page, next_page, endpoint, *args, params=None):
+        """Make GET requests for the pages of a list endpoint one by one
+
+        Starts with `page`; `next_page` returns the number of the page that
+        follows a response, or None.  Stops at the first unsuccessful response.
+        """
+        responses = []
+        params = params or {}
+        while page:
+            response = await self.get(endpoint, *args, params={**params, 'page': page})
+            responses.append(response)
+            if not response.ok:
+                break
+            page = next_page(response)
+        return responses
+
+    async def request(self, method, endpoint, *args, **kwargs):
+        """Make an HTTP request and return its fully read response
+
+        Arguments are appended to the endpoint to form the URL path.
+        Keyword arguments are passed to the request.
+
+        Requests are retried like with ``ServiceRequestsMixin.request()``.
+        With aiohttp, idempotent requests are also retried on connection
+        errors.
+        """
+        url = self.url_for_endpoint(endpoint, *args)
+        for attempt in range(self.RETRY_ATTEMPTS):
+            last_attempt = attempt + 1 == self.RETRY_ATTEMPTS
+            try:
+                response = await self.send(method, url, **kwargs)
+            except self.connection_errors:
+                if last_attempt or method not in self.IDEMPOTENT_METHODS:
+                    raise
+                response = None
+            else:
+                if last_attempt or not self.should_retry(method, response):
+                    break
+            delay = retry_delay(response, attempt, self.RETRY_BACKOFF, self.RETRY_BACKOFF_MAX)
+            if delay > self.RETRY_AFTER_MAX:
+                break
+            await asyncio.sleep(delay)
+        return response
+
+    async def send(self, method, url, **kwargs):
+        """Make a single HTTP request to a URL, with the client in use"""
+        if self.http2:
+            response = await self.session.request(method, url, **httpx_arguments(kwargs))
+            return httpx_response(response)
+        if 'params' in kwargs:
+            kwargs = {**kwargs, 'params': query_params(kwargs['params'])}
+        async with self.session.request(method, url, **kwargs) as response:
+            content = await response.read()
+        return make_response(response.status, content, headers=response.headers,
+                             url=str(response.url), reason=response.reason)
+
+    async def get(self, endpoint, *args, **kwargs):
+        """Make a GET request handling authentication and timeout"""
+        return await self.request('GET', endpoint, *args, **kwargs)
+
+    async def post(self, endpoint, *args, **kwargs):
+        """Make a POST request handling authentication and timeout"""
+        return await self.request('POST', endpoint, *args, **kwargs)
+
+    async def put(self, endpoint, *args, **kwargs):
+        """Make a PUT request handling authentication and timeout"""
+        return await self.request('PUT', endpoint, *args, **kwargs)
+
+    async def delete(self, endpoint, *args, **kwargs):
+        """Make a DELETE request handling authentication and timeout"""
+        return await self.request('DELETE', endpoint, *args, **kwargs)
+
+
+class AsyncStrategyProtocol(Protocol):
+    """
+    Interface for an asynchronous VCS service API implementation (strategy
+    pattern).
+    """
+
+    async def create_project(self, name, slug=None, **kwargs):
+        """Create a repository project on the service platform"""
+
+    async def update_project(self, key, slug=None, **kwargs):
+        """Update a repository project on the service platform"""
+
+    async def delete_project(self, key, slug):
+        """Safe-delete a repository project on the service platform
+
+        Only when `slug` matches the project with `key` the project is
+        deleted, and should return HTTP400_DELETION_REFUSED otherwise.
+        """
+
+    async def list_projects(self, per_page=100, concurrency=None):
+        """Get a list of all user's projects on the service platform
+
+        All pages of the list are fetched, up to `concurrency` (by default
+        PAGE_CONCURRENCY) at a time.
+        """
+
+    async def project_details(self, key):
+        """Get details of a single project on the service platform"""
+
+    async def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
+        """Create a new deploy key for a project on the service platform"""
+
+
+class AsyncServiceAPIStrategy(AsyncServiceRequestsMixin):
+    """
+    Base class for asynchronous VCS service API implementations, providing
+    the HTTP request handling.  Subclasses implement `AsyncStrategyProtocol`.
+    """
+    __slots__ = ()
+
+    DEFAULT_TIMEOUT = ServiceAPIStrategy.DEFAULT_TIMEOUT
+    HTTP400_DELETION_REFUSED = ServiceAPIStrategy.HTTP400_DELETION_REFUSED
+
+    def __init__(self, base_url, oauth_token, headers=None, timeout=DEFAULT_TIMEOUT,
+                 http2=False):
+        """
+        The asynchronous behavior of an API of a specific VCS service
+        (strategy pattern).
+        """
+        if headers is None:
+            headers = {}
+        headers['Authorization'] = f'Bearer {oauth_token}'
+        super().__init__(base_url, headers, timeout, http2)
+
+    @classmethod
+    def from_strategy(cls, strategy, http2=False):
+        """
+        Return an asynchronous strategy with the base URL, headers (including
+        the credentials), timeout and tunables of a synchronous `strategy`.
+        Headers the HTTP client sets by itself are left to the new client.
+        """
+        async_strategy = tuned_strategy_class(cls, type(strategy))(oauth_token=None,
+                                                                     http2=http2)
+        async_strategy.base_url = strategy.base_url
+        async_strategy.headers = {name: value for name, value in strategy.headers.items()
+                                  if name.lower() not in CLIENT_HEADERS}
+        async_strategy.timeout = strategy.timeout
+        return async_strategy
+
+    async def __aenter__(self):
+        """Use the strategy as an async context manager, closing it on exit"""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Release network resources held by the strategy"""
+        await self.close()
+
+
+class AsyncServiceAPI:
+    """
+    Generic asynchronous API for a version control system service hosting
+    source code repositories.  Independent calls can run concurrently, e.g.
+    using ``asyncio.gather()``.
+
+    Usage example:
+        async with AsyncGitLabStrategy(oauth_token='abcdefg1234567') as strategy:
+            api = AsyncServiceAPI(strategy)
+            await api.list_projects()
+    """
+    __slots__ = ('strategy', 'response')
+
+    BULK_CONCURRENCY = 8
+
+    def __init__(self, strategy: AsyncStrategyProtocol):
+        """
+        An API bus with the asynchronous behavior of a specific VCS service
+        (strategy pattern).
+        """
+        self.strategy = strategy
+        self.response = None
+
+    async def create_project(self, name, **kwargs):
+        """Create a repository project on the service platform"""
+        response = await self.strategy.create_project(name, **kwargs)
+        self.response = response_json(response)
+        response.raise_for_status()
+
+    async def update_project(self, key, **kwargs):
+        """Update a repository project on the service platform"""
+        response = await self.strategy.update_project(key, **kwargs)
+        self.response = response_json(response)
+        response.raise_for_status()
+
+    async def delete_project(self, key, slug):
+        """Delete a repository project on the service platform"""
+        response = await self.strategy.delete_project(key, slug)
+        self.response = response_json(response)
+        response.raise_for_status()
+
+    async def list_projects(self, **kwargs):
+        """Get a list of user's projects on the service platform"""
+        response = await self.strategy.list_projects(**kwargs)
+        self.response = response_json(response)
+        response.raise_for_status()
+
+    async def project_details(self, key):
+        """Get details of a single project on the service platform"""
+        response = await self.strategy.project_details(key)
+        self.response = response_json(response)
+        response.raise_for_status()
+
+    async def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
+        """Create a new deploy key for a project on the service platform"""
+        response = await self.strategy.add_deploy_key(project_id, key_title, ssh_key, read_only)
+        self.response = response_json(response)
+        response.raise_for_status()
+
+    async def bulk_add_deploy_key(self, project_ids, key_title, ssh_key, read_only=True,
+                                  concurrency=None):
+        """Create the same deploy key for several projects, concurrently
+
+        At most `concurrency` (by default BULK_CONCURRENCY) requests are in
+        flight at a time.  The response is a list of JSON results, in the
+        order of `project_ids`.
+        """
+        if concurrency is None:
+            concurrency = self.BULK_CONCURRENCY
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def add_deploy_key(project_id):
+            async with semaphore:
+                return await self.strategy.add_deploy_key(project_id, key_title, ssh_key,
+                                                          read_only)
+
+        responses = await asyncio.gather(*(add_deploy_key(project_id)
+                                           for project_id in project_ids))
+        self.response = [response_json(response) for response in responses]
+        for response in responses:
+            response.raise_for_status()
@@ -1,25 +1,230 @@
 """
 Generic API access implementation for a version control system service.
 """
-from abc import ABCMeta, abstractmethod
-
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Protocol
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import asyncio
 import json
+import random
+import threading
+import time
+import weakref
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dump_json(data):
+    """Encode data as JSON bytes, using orjson if available"""
+    if orjson is None:
+        return bytes(json.dumps(data), encoding='UTF-8')
+    return orjson.dumps(data)
+
+
+def response_json(response):
+    """
+    Decode the JSON body of a response, using orjson if available.  Raises
+    ``requests.exceptions.JSONDecodeError`` for an invalid or empty body,
+    like ``response.json()``.
+    """
+    if orjson is None:
+        return response.json()
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as error:
+        raise requests.exceptions.JSONDecodeError(error.msg, error.doc, error.pos) from error
+
+
+def make_response(status_code, content, headers=None, url=None, reason=None):
+    """
+    Wrap the data of a response received through another HTTP client library
+    in a ``requests.Response`` object, so that all API calls return the same
+    type of response (and raise the same type of exceptions).
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = reason
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = content
+    return response
+
+
+def query_params(params):
+    """
+    Convert query parameters to strings, dropping those without a value,
+    like requests does (other client libraries treat values differently).
+    """
+    return {key: str(value) for key, value in params.items() if value is not None}
+
+
+def httpx_arguments(kwargs):
+    """Adapt the keyword arguments of a requests call for httpx"""
+    if isinstance(kwargs.get('data'), (bytes, str)):
+        kwargs['content'] = kwargs.pop('data')
+    if 'params' in kwargs:
+        kwargs['params'] = query_params(kwargs['params'])
+    return kwargs
+
+
+def httpx_response(response):
+    """Wrap a response received through httpx in a ``requests.Response``"""
+    return make_response(response.status_code, response.content, headers=response.headers,
+                         url=str(response.url), reason=response.reason_phrase)
+
+
+def iter_json_items(chunks, prefix='item'):
+    """
+    Yield the items at `prefix` of a JSON document received in chunks of
+    bytes, parsing it incrementally (requires ijson).
+    """
+    import ijson
+
+    items = ijson.sendable_list()
+    parser = ijson.items_coro(items, prefix)
+    for chunk in chunks:
+        parser.send(chunk)
+        yield from items
+        del items[:]
+    parser.close()
+    yield from items
+
+
+def rate_limited(response):
+    """
+    Whether a response rejects a request for exceeding the rate limit: a 429,
+    or a 403 carrying rate limit headers, as GitHub answers.
+    """
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        'Retry-After' in response.headers
+        or response.headers.get('X-RateLimit-Remaining') == '0')
 
 
-def merge_dict(thedict, **kwargs_with_dict_values):
+def retry_delay(response, attempt, backoff, backoff_max):
     """
-    Update or add dictionary values in a dictionary for specific keys.
-    An existing value is _updated_, not replaced (as with ``dict.update()``),
-    preserving unaffected parts of the existing dictionary value.  Raises an
-    AttributeError if ``thedict[keyword]`` exists but is not a dictionary.
+    Return the seconds to wait before retrying a request: as requested by the
+    Retry-After header of the response (in seconds or as an HTTP date), until
+    the X-RateLimit-Reset time of an exhausted rate limit, or an exponential
+    backoff with jitter otherwise.
     """
-    for key, value in kwargs_with_dict_values.items():
+    headers = response.headers if response is not None else {}
+    retry_after = headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return int(retry_after)
+    if retry_after:
         try:
-            thedict[key].update(value)
-        except KeyError:
-            thedict.update({key: value})
-    return thedict
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            pass
+    rate_limit_reset = headers.get('X-RateLimit-Reset', '')
+    if headers.get('X-RateLimit-Remaining') == '0' and rate_limit_reset.isdigit():
+        return max(int(rate_limit_reset) - time.time(), 0)
+    delay = min(backoff * 2 ** attempt, backoff_max)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+URLLIB3_ERRORS = (
+    urllib3.exceptions.MaxRetryError,
+    urllib3.exceptions.NewConnectionError,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.SSLError,
+    urllib3.exceptions.TimeoutError,
+)
+
+
+def requests_error(error):
+    """
+    Return the requests exception for a urllib3 one, as raised by requests
+    for the same failure.
+    """
+    reason = error
+    if isinstance(error, urllib3.exceptions.MaxRetryError) and error.reason is not None:
+        reason = error.reason
+        if isinstance(reason, urllib3.exceptions.ResponseError):
+            return requests.exceptions.RetryError(error)
+    if isinstance(reason, urllib3.exceptions.NewConnectionError):
+        return requests.exceptions.ConnectionError(error)
+    if isinstance(reason, urllib3.exceptions.ConnectTimeoutError):
+        return requests.exceptions.ConnectTimeout(error)
+    if isinstance(reason, urllib3.exceptions.ReadTimeoutError):
+        return requests.exceptions.ReadTimeout(error)
+    if isinstance(reason, urllib3.exceptions.TimeoutError):
+        return requests.exceptions.Timeout(error)
+    if isinstance(reason, urllib3.exceptions.SSLError):
+        return requests.exceptions.SSLError(error)
+    return requests.exceptions.ConnectionError(error)
+
+
+def urllib3_response(response, url):
+    """Wrap a response received through urllib3 in a ``requests.Response``"""
+    return make_response(response.status, response.data, headers=response.headers,
+                         url=url, reason=response.reason)
+
+
+def cache_key(url, params=None):
+    """
+    Return the key of a GET request in the cache: its URL and query string,
+    for query parameters in any of the forms requests accepts.
+    """
+    if isinstance(params, (str, bytes)):
+        return url, params
+    return url, urlencode(params or {}, doseq=True)
+
+
+def page_of_url(url):
+    """Return the page number in the query string of a URL, or None"""
+    if not url:
+        return None
+    pages = parse_qs(urlparse(url).query).get('page')
+    return int(pages[0]) if pages else None
+
+
+PAGE_HEADERS = {'link', 'x-page', 'x-next-page', 'x-prev-page', 'x-total-pages',
+                'content-length', 'content-encoding'}
+
+
+def join_pages(responses, key=None):
+    """
+    Combine the JSON lists of the responses of a paginated list endpoint in
+    a single response.  Returns the first unsuccessful response instead, if
+    any.  Use `key` when the list is wrapped in a JSON object; a reference to
+    the next page in that object (``next``) is removed, like the pagination
+    headers and those describing the body of the first response.
+    """
+    for response in responses:
+        if not response.ok:
+            return response
+
+    first, *others = responses
+    if not others:
+        return first
+
+    data = response_json(first)
+    items = data[key] if key else data
+    for response in others:
+        page = response_json(response)
+        items.extend(page[key] if key else page)
+    if key:
+        data.pop('next', None)
+
+    headers = {name: value for name, value in first.headers.items()
+               if name.lower() not in PAGE_HEADERS}
+    return make_response(first.status_code, dump_json(data),
+                         headers=headers, url=first.url, reason=first.reason)
 
 
 class JSONResponse(requests.Response):
@@ -30,40 +235,393 @@ class JSONResponse(requests.Response):
         super().__init__()
         self.status_code = status_code
         self.reason = reason
-        self._content = bytes(json.dumps({'message': reason}), encoding='UTF-8')
+        self._content = dump_json({'message': reason})
+
+    @classmethod
+    def from_reason(cls, reason, status_code=200):
+        """
+        Return a response object for a reason, constructed at most once.
+        Meant for static messages, e.g. errors returned in place of a request.
+        """
+        return cached_json_response(cls, reason, status_code)
+
+
+@lru_cache(maxsize=64)
+def cached_json_response(response_class, reason, status_code, /):
+    """
+    Construct the response object of JSONResponse.from_reason(), with its
+    arguments normalized to positional ones to be cached regardless of how
+    they were passed.
+    """
+    return response_class(reason, status_code=status_code)
 
 
 class ServiceRequestsMixin:
     """
     A collection of functions for making HTTP request calls against a REST API
-    """
 
-    def __init__(self, base_url, headers, timeout):
+    Requests are made through a requests session per thread, through an
+    httpx client with HTTP/2 support when `http2` is set (requires
+    ``httpx[http2]``), or through a bare urllib3 pool manager when
+    `pool_manager` is set, which skips the request preparation of requests.
+
+    The tunables in upper case (pool sizes, retries, concurrency, caching)
+    are class attributes.  As the class has ``__slots__``, they cannot be
+    assigned on an instance; set them by subclassing instead, e.g.::
+
+        class PatientGitLabStrategy(GitLabStrategy):
+            RETRY_ATTEMPTS = 10
+            GET_CACHE_TTL = 0
+    """
+    __slots__ = ('base_url', 'timeout', 'http2', 'pool_manager', 'headers', '_client',
+                 '_local', '_sessions', '_executor', '_executor_lock',
+                 '_get_cache', '_get_cache_lock')
+
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 20
+    MAX_RETRIES = Retry(total=3, backoff_factor=0.3)
+    RETRY_ATTEMPTS = 5
+    RETRY_STATUSES = {429, 502, 503, 504}
+    RETRY_BACKOFF = 0.5  # seconds, doubled with every attempt
+    RETRY_BACKOFF_MAX = 10  # seconds
+    RETRY_AFTER_MAX = 60  # seconds, longer waits asked for by the service aren't taken
+    IDEMPOTENT_METHODS = {'GET', 'PUT', 'DELETE'}
+    PAGE_CONCURRENCY = 8
+    MAX_WORKERS = 20
+    GET_CACHE_SIZE = 256
+    GET_CACHE_TTL = 5  # seconds
+
+    def __init__(self, base_url, headers, timeout, http2=False, pool_manager=False):
         """Just a mixin, initialized in ServiceAPIStrategy constructor"""
         self.base_url = base_url
-        self.headers = headers
         self.timeout = timeout
+        self.http2 = http2
+        self.pool_manager = pool_manager and not http2
+        if http2:
+            self._client = self.create_http2_client(headers)
+            self.headers = self._client.headers
+        elif pool_manager:
+            self._client = self.create_pool_manager()
+            self.headers = CaseInsensitiveDict(urllib3.util.make_headers(accept_encoding=True))
+            self.headers.update(headers)
+        else:
+            self._client = None
+            self.headers = requests.utils.default_headers()
+            self.headers.update(headers)
+        self._local = threading.local()
+        self._sessions = weakref.WeakSet()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._get_cache = OrderedDict()
+        self._get_cache_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The client for the current thread
+
+        Each thread uses a requests session of its own, so that threads don't
+        contend for the connections of a shared pool.  All sessions share the
+        same headers.  The httpx client and the urllib3 pool manager are
+        thread-safe and shared.
+        """
+        if self._client is not None:
+            return self._client
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self.create_session(self.headers)
+            self._local.session = session
+            self._sessions.add(session)
+        return session
+
+    def create_session(self, headers):
+        """Return a session with connection pooling (HTTP keep-alive)
+
+        The session uses the `headers` mapping as it is, not a copy of it.
+        """
+        session = requests.Session()
+        session.headers = headers
+        adapter = HTTPAdapter(pool_connections=self.POOL_CONNECTIONS,
+                              pool_maxsize=self.POOL_MAXSIZE,
+                              max_retries=self.MAX_RETRIES)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def create_http2_client(self, headers):
+        """Return an httpx client multiplexing requests over HTTP/2"""
+        import httpx
+
+        limits = httpx.Limits(max_keepalive_connections=self.POOL_CONNECTIONS,
+                              max_connections=self.POOL_MAXSIZE)
+        transport = httpx.HTTPTransport(http1=True, http2=True, limits=limits,
+                                        retries=self.MAX_RETRIES.total)
+        return httpx.Client(headers=headers, transport=transport, follow_redirects=True)
+
+    def create_pool_manager(self):
+        """Return a urllib3 pool manager, for sending requests with less overhead"""
+        return urllib3.PoolManager(num_pools=self.POOL_CONNECTIONS,
+                                   maxsize=self.POOL_MAXSIZE,
+                                   retries=self.MAX_RETRIES,
+                                   timeout=urllib3.Timeout(total=self.timeout))
+
+    def close(self):
+        """Release the pooled connections of all threads and the workers"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        if self.pool_manager:
+            self._client.clear()
+        elif self._client is not None:
+            self._client.close()
+        for session in list(self._sessions):
+            session.close()
+        self._sessions.clear()
+        self._local = threading.local()
+
+    @property
+    def executor(self):
+        """The pool of worker threads for concurrent requests
+
+        The pool is shared by all callers and has MAX_WORKERS threads; the
+        workers are kept, and with them their sessions and connections.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+            return self._executor
+
+    def invalidate(self, endpoint=None, *args):
+        """Discard cached GET responses
+
+        Only responses for URLs starting with the endpoint and arguments are
+        discarded, if given.  Any request other than GET discards all of them.
+        """
+        with self._get_cache_lock:
+            if endpoint is None:
+                self._get_cache.clear()
+                return
+            prefix = self.url_for_endpoint(endpoint, *args)
+            for key in [key for key in self._get_cache if key[0].startswith(prefix)]:
+                del self._get_cache[key]
 
     def url_for_endpoint(self, endpoint, *args):
         """Return the full URL for an API endpoint"""
-        # return '/'.join([self.base_url, endpoint, *args])  # Python 3.5 syntax (PEP 448)
-        return '/'.join((self.base_url, endpoint) + args)
+        if not args:
+            return f'{self.base_url}/{endpoint}'
+        return '/'.join((self.base_url, endpoint, *args))
 
     def get_json_or_raise(self, endpoint, *args, **kwargs):
         """Make a GET request, ensure it was successful, and return JSON"""
         response = self.get(endpoint, *args, **kwargs)
         response.raise_for_status()
-        return response.json()
+        return response_json(response)
+
+    def get_pages(self, endpoint, *args, pages, params=None, concurrency=None):
+        """Make GET requests for several pages of a list endpoint concurrently
 
-    def get(self, endpoint, *args, **kwargs):
-        """Make a GET request handling authentication and timeout
+        At most `concurrency` (by default PAGE_CONCURRENCY) requests of a call
+        are in flight at a time, and at most MAX_WORKERS of all calls.
+        Returns the responses in the order of `pages`.
+        """
+        pages = list(pages)
+        if not pages:
+            return []
+        params = params or {}
+        if concurrency is None:
+            concurrency = self.PAGE_CONCURRENCY
+        semaphore = threading.Semaphore(concurrency)
+
+        def get_page(page):
+            with semaphore:
+                return self.get(endpoint, *args, params={**params, 'page': page})
+
+        return list(self.executor.map(get_page, pages))
+
+    def get_next_pages(self, page, next_page, endpoint, *args, params=None):
+        """Make GET requests for the pages of a list endpoint one by one
+
+        Starts with `page`; `next_page` returns the number of the page that
+        follows a response, or None.  Stops at the first unsuccessful response.
+        """
+        responses = []
+        params = params or {}
+        while page:
+            response = self.get(endpoint, *args, params={**params, 'page': page})
+            responses.append(response)
+            if not response.ok:
+                break
+            page = next_page(response)
+        return responses
+
+    def get_items(self, endpoint, *args, prefix='item', **kwargs):
+        """Make a GET request and yield the items of its JSON list one by one
+
+        The body is parsed while it is received.  The HTTP response (of the
+        client library in use) is the return value of the generator.  The
+        connection is released when the generator is exhausted or closed.
+
+        The request is retried like with ``request()``.
+        """
+        url = self.url_for_endpoint(endpoint, *args)
+        response = self.retry('GET', lambda: self.open_stream(url, **kwargs),
+                              release=lambda response: response.close())
+        if self.http2:
+            try:
+                if response.is_error:
+                    response.read()
+                    httpx_response(response).raise_for_status()
+                yield from iter_json_items(response.iter_bytes(), prefix)
+            finally:
+                response.close()
+        elif self.pool_manager:
+            raw_response = response.raw
+            try:
+                if raw_response.status >= 400:
+                    urllib3_response(raw_response, url).raise_for_status()
+                yield from iter_json_items(raw_response.stream(), prefix)
+            except URLLIB3_ERRORS as error:
+                raise requests_error(error) from error
+            finally:
+                raw_response.release_conn()
+        else:
+            with response:
+                response.raise_for_status()
+                yield from iter_json_items(response.iter_content(chunk_size=None), prefix)
+        return response
+
+    def open_stream(self, url, **kwargs):
+        """Make a GET request to a URL, leaving the body of its response unread"""
+        if self.http2:
+            request = self.session.build_request('GET', url, timeout=self.timeout,
+                                                 **httpx_arguments(kwargs))
+            return self.session.send(request, stream=True)
+        if self.pool_manager:
+            raw_response = self.urlopen('GET', url, preload_content=False, **kwargs)
+            # headers only, e.g. for reading pagination links
+            response = make_response(raw_response.status, b'', headers=raw_response.headers,
+                                     url=url, reason=raw_response.reason)
+            response.raw = raw_response
+            return response
+        return self.session.get(url, timeout=self.timeout, stream=True, **kwargs)
+
+    def should_retry(self, method, response):
+        """Whether a request should be repeated because of its response
+
+        Rate limited requests (429, or 403 with rate limit headers) are always
+        retried, temporary server errors only for idempotent methods.
+        """
+        if rate_limited(response):
+            return True
+        if response.status_code not in self.RETRY_STATUSES:
+            return False
+        return method in self.IDEMPOTENT_METHODS
+
+    def urlopen(self, method, url, params=None, json=None, data=None, headers=None,
+                **kwargs):
+        """Make an HTTP request through the urllib3 pool manager
+
+        Takes the keyword arguments of requests for query parameters, body
+        and headers; any others are passed to urllib3.  Failures raise the
+        exceptions of requests, like with the other clients.
+        """
+        if params:
+            url = f'{url}?{urlencode(query_params(params))}'
+        headers = {**self.headers, **(headers or {})}
+        if json is not None:
+            data = dump_json(json)
+            headers['Content-Type'] = 'application/json'
+        try:
+            return self._client.request(method, url, body=data, headers=headers, **kwargs)
+        except URLLIB3_ERRORS as error:
+            raise requests_error(error) from error
+
+    def send(self, method, url, **kwargs):
+        """Make a single HTTP request to a URL, with the client in use"""
+        if self.http2:
+            response = self.session.request(method, url, timeout=self.timeout,
+                                            **httpx_arguments(kwargs))
+            return httpx_response(response)
+        if self.pool_manager:
+            return urllib3_response(self.urlopen(method, url, **kwargs), url)
+        return self.session.request(method, url, timeout=self.timeout, **kwargs)
+
+    def request(self, method, endpoint, *args, **kwargs):
+        """Make an HTTP request handling authentication, timeout and retries
+
+        Arguments are appended to the endpoint to form the URL path.
+        Keyword arguments are passed to the request.
+
+        Requests are retried up to RETRY_ATTEMPTS times if the service is
+        rate limiting or temporarily unavailable (see ``should_retry()``).
+        When the service asks to wait longer than RETRY_AFTER_MAX seconds,
+        its response is returned instead.  Connection errors are retried by
+        the client library already.
+        """
+        url = self.url_for_endpoint(endpoint, *args)
+        response = self.retry(method, lambda: self.send(method, url, **kwargs))
+        if method != 'GET':
+            self.invalidate()
+        return response
+
+    def retry(self, method, send, release=None):
+        """Call `send` for a response until it isn't to be retried (see `request()`)
+
+        The responses given up on are passed to `release`, if any, e.g. to
+        close their connection.
+        """
+        for attempt in range(self.RETRY_ATTEMPTS):
+            response = send()
+            if attempt + 1 == self.RETRY_ATTEMPTS or not self.should_retry(method, response):
+                break
+            delay = retry_delay(response, attempt, self.RETRY_BACKOFF, self.RETRY_BACKOFF_MAX)
+            if delay > self.RETRY_AFTER_MAX:
+                break
+            if release is not None:
+                release(response)
+            time.sleep(delay)
+        return response
+
+    def get(self, endpoint, *args, max_age=None, **kwargs):
+        """Make a GET request handling authentication, timeout and caching
 
         Arguments are appended to the endpoint to form the URL path.
         Keyword arguments are passed to the request.
+
+        Successful responses are reused for `max_age` seconds (by default
+        GET_CACHE_TTL), and then revalidated by their ETag, if any (304 Not
+        Modified comes without a body).  With ``max_age=0`` the service is
+        always asked.  Requests with keyword arguments other than `params`
+        bypass the cache.
         """
+        if max_age is None:
+            max_age = self.GET_CACHE_TTL
+        if set(kwargs) - {'params'}:
+            return self.request('GET', endpoint, *args, **kwargs)
+
         url = self.url_for_endpoint(endpoint, *args)
-        kwargs = merge_dict(kwargs, headers=self.headers)
-        return requests.get(url, timeout=self.timeout, **kwargs)
+        key = cache_key(url, kwargs.get('params'))
+        with self._get_cache_lock:
+            cached = self._get_cache.get(key)
+        if cached is not None:
+            timestamp, etag, cached_response = cached
+            if time.monotonic() - timestamp < max_age:
+                return cached_response
+            if etag:
+                kwargs['headers'] = {'If-None-Match': etag}
+
+        response = self.request('GET', endpoint, *args, **kwargs)
+        if cached is not None and response.status_code == 304:
+            response = cached_response
+
+        if response.ok:
+            with self._get_cache_lock:
+                self._get_cache[key] = (time.monotonic(), response.headers.get('ETag'),
+                                        response)
+                self._get_cache.move_to_end(key)
+                if len(self._get_cache) > self.GET_CACHE_SIZE:
+                    self._get_cache.popitem(last=False)
+        return response
 
     def post(self, endpoint, *args, **kwargs):
         """Make a POST request handling authentication and timeout
@@ -71,9 +629,7 @@ class ServiceRequestsMixin:
         Arguments are appended to the endpoint to form the URL path.
         Keyword arguments are passed to the request.
         """
-        url = self.url_for_endpoint(endpoint, *args)
-        kwargs = merge_dict(kwargs, headers=self.headers)
-        return requests.post(url, timeout=self.timeout, **kwargs)
+        return self.request('POST', endpoint, *args, **kwargs)
 
     def put(self, endpoint, *args, **kwargs):
         """Make a PUT request handling authentication and timeout
@@ -81,9 +637,7 @@ class ServiceRequestsMixin:
         Arguments are appended to the endpoint to form the URL path.
         Keyword arguments are passed to the request.
         """
-        url = self.url_for_endpoint(endpoint, *args)
-        kwargs = merge_dict(kwargs, headers=self.headers)
-        return requests.put(url, timeout=self.timeout, **kwargs)
+        return self.request('PUT', endpoint, *args, **kwargs)
 
     def delete(self, endpoint, *args, **kwargs):
         """Make a DELETE request handling authentication and timeout
@@ -91,56 +645,79 @@ class ServiceRequestsMixin:
         Arguments are appended to the endpoint to form the URL path.
         Keyword arguments are passed to the request.
         """
-        url = self.url_for_endpoint(endpoint, *args)
-        kwargs = merge_dict(kwargs, headers=self.headers)
-        return requests.delete(url, timeout=self.timeout, **kwargs)
+        return self.request('DELETE', endpoint, *args, **kwargs)
 
 
-class ServiceAPIStrategy(ServiceRequestsMixin, metaclass=ABCMeta):
+class StrategyProtocol(Protocol):
     """
     Interface for a VCS service API implementation (strategy pattern).
     """
-    DEFAULT_TIMEOUT = 30  # seconds
-    HTTP400_DELETION_REFUSED = JSONResponse(
-        status_code=400, reason="Slug does not match project. Deletion refused.")
-
-    def __init__(self, base_url, oauth_token, headers=None, timeout=DEFAULT_TIMEOUT):
-        """
-        The behavior of an API of a specific VCS service (strategy pattern).
-        """
-        if headers is None:
-            headers = {}
-        headers.update({'Authorization': 'Bearer %s' % oauth_token})
-        super().__init__(base_url, headers, timeout)
 
-    @abstractmethod
     def create_project(self, name, slug=None, **kwargs):
         """Create a repository project on the service platform"""
 
-    @abstractmethod
     def update_project(self, key, slug=None, **kwargs):
         """Update a repository project on the service platform"""
 
-    @abstractmethod
     def delete_project(self, key, slug):
         """Safe-delete a repository project on the service platform
 
         Only when `slug` matches the project with `key` the project is
-        deleted, and should return HTTP404_DELETION_REFUSED otherwise.
+        deleted, and should return HTTP400_DELETION_REFUSED otherwise.
         """
 
-    @abstractmethod
-    def list_projects(self):
-        """Get a list of user's projects on the service platform"""
+    def list_projects(self, per_page=100, concurrency=None):
+        """Get a list of all user's projects on the service platform
 
-    @abstractmethod
-    def project_details(self, key):
-        """Get details of a single project on the service platform"""
+        All pages of the list are fetched, up to `concurrency` (by default
+        PAGE_CONCURRENCY) at a time.
+        """
+
+    def project_details(self, key, max_age=None):
+        """Get details of a single project on the service platform
+
+        Details cached for less than `max_age` seconds may be returned.
+        """
 
-    @abstractmethod
     def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
         """Create a new deploy key for a project on the service platform"""
 
+    def async_strategy(self, http2=False):
+        """
+        Return an asynchronous strategy for the service platform, with the
+        settings of this strategy.
+        """
+
+
+class ServiceAPIStrategy(ServiceRequestsMixin):
+    """
+    Base class for VCS service API implementations, providing the HTTP
+    request handling.  Subclasses implement `StrategyProtocol`.
+    """
+    __slots__ = ()
+
+    DEFAULT_TIMEOUT = 30  # seconds
+    HTTP400_DELETION_REFUSED = JSONResponse.from_reason(
+        status_code=400, reason="Slug does not match project. Deletion refused.")
+
+    def __init__(self, base_url, oauth_token, headers=None, timeout=DEFAULT_TIMEOUT,
+                 http2=False, pool_manager=False):
+        """
+        The behavior of an API of a specific VCS service (strategy pattern).
+        """
+        if headers is None:
+            headers = {}
+        headers['Authorization'] = f'Bearer {oauth_token}'
+        super().__init__(base_url, headers, timeout, http2, pool_manager)
+
+    def __enter__(self):
+        """Use the strategy as a context manager, closing it on exit"""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release network resources held by the strategy"""
+        self.close()
+
 
 class ServiceAPI:
     """
@@ -150,49 +727,74 @@ class ServiceAPI:
     Usage example:
         api = ServiceAPI(GitLabStrategy(oauth_token='abcdefg1234567'))
     """
+    __slots__ = ('strategy', 'response')
 
-    def __init__(self, strategy):
+    def __init__(self, strategy: StrategyProtocol):
         """
         An API bus with the behavior of a specific VCS service (strategy
         pattern).
         """
-        assert isinstance(strategy, ServiceAPIStrategy), \
-            "strategy must be an instance of ServiceAPIStrategy."
         self.strategy = strategy
         self.response = None
 
     def create_project(self, name, **kwargs):
         """Create a repository project on the service platform"""
         response = self.strategy.create_project(name, **kwargs)
-        self.response = response.json()
+        self.response = response_json(response)
         response.raise_for_status()
 
     def update_project(self, key, **kwargs):
         """Update a repository project on the service platform"""
         response = self.strategy.update_project(key, **kwargs)
-        self.response = response.json()
+        self.response = response_json(response)
         response.raise_for_status()
 
     def delete_project(self, key, slug):
         """Delete a repository project on the service platform"""
         response = self.strategy.delete_project(key, slug)
-        self.response = response.json()
+        self.response = response_json(response)
         response.raise_for_status()
 
-    def list_projects(self):
+    def list_projects(self, **kwargs):
         """Get a list of user's projects on the service platform"""
-        response = self.strategy.list_projects()
-        self.response = response.json()
+        response = self.strategy.list_projects(**kwargs)
+        self.response = response_json(response)
         response.raise_for_status()
 
     def project_details(self, key):
         """Get details of a single project on the service platform"""
         response = self.strategy.project_details(key)
-        self.response = response.json()
+        self.response = response_json(response)
         response.raise_for_status()
 
     def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
         """Create a new deploy key for a project on the service platform"""
         response = self.strategy.add_deploy_key(project_id, key_title, ssh_key, read_only)
-        self.response = response.json()
+        self.response = response_json(response)
         response.raise_for_status()
+
+    def bulk_add_deploy_key(self, project_ids, key_title, ssh_key, read_only=True,
+                            concurrency=None):
+        """Create the same deploy key for several projects at once
+
+        Runs ``AsyncServiceAPI.bulk_add_deploy_key()`` with the asynchronous
+        counterpart of the strategy over HTTP/2, multiplexing the requests
+        over a single connection (requires ``httpx[http2]``).  Cannot be
+        called from within a running event loop; use ``AsyncServiceAPI``
+        there instead.
+        """
+        from .async_base import AsyncServiceAPI
+
+        async def bulk_add_deploy_key():
+            async with self.strategy.async_strategy(http2=True) as strategy:
+                api = AsyncServiceAPI(strategy)
+                try:
+                    await api.bulk_add_deploy_key(project_ids, key_title, ssh_key,
+                                                  read_only, concurrency)
+                finally:
+                    self.response = api.response
+
+        try:
+            asyncio.run(bulk_add_deploy_key())
+        finally:
+            self.strategy.invalidate()
@@ -3,38 +3,60 @@ API access implementation for Bitbucket.
 
 See: https://developer.atlassian.com/bitbucket/api/2/reference/
 """
-from django.template.defaultfilters import slugify
+import asyncio
 
-from .base import ServiceAPI, ServiceAPIStrategy
+from ._slug import slugify
+from .async_base import AsyncServiceAPI, AsyncServiceAPIStrategy
+from .base import ServiceAPI, ServiceAPIStrategy, join_pages, page_of_url, response_json
+
+
+def next_page(response):
+    """Return the number of the page following a Bitbucket response, or None"""
+    return page_of_url(response_json(response).get('next'))
+
+
+def total_pages(response):
+    """Return the number of pages of a Bitbucket list, or None if unknown"""
+    details = response_json(response)
+    if 'size' not in details:
+        return None
+    return -(-details['size'] // details['pagelen'])
 
 
 class BitbucketStrategy(ServiceAPIStrategy):
     """API bus implementation for accessing Bitbucket resources"""
+    __slots__ = ('_username',)
 
-    def __init__(self, oauth_token):
+    MAX_PAGELEN = 100
+    CREATE_DEFAULTS = {
+        'has_issues': False,
+        'has_wiki': False,
+        'is_private': True,
+        'scm': 'git',
+    }
+
+    def __init__(self, oauth_token, http2=False, pool_manager=False):
         """API access to the Bitbucket hosted service"""
         super().__init__(base_url='https://api.bitbucket.org/2.0',
-                         oauth_token=oauth_token)
+                         oauth_token=oauth_token,
+                         http2=http2,
+                         pool_manager=pool_manager)
+        self._username = None
 
     @property
     def username(self):
-        """Yield the username of the Bitbucket account by querying the API"""
-        user_details = self.get_json_or_raise('user')
-        return user_details['username']
+        """Return the username of the Bitbucket account, querying the API only once"""
+        if self._username is None:
+            user_details = self.get_json_or_raise('user')
+            self._username = user_details['username']
+        return self._username
 
     def create_project(self, name, slug=None, **kwargs):
         """Create a repository project on Bitbucket"""
-        default_settings = {
-            'has_issues': False,
-            'has_wiki': False,
-            'is_private': True,
-            'name': name,
-            'scm': 'git',
-        }
-        default_settings.update(kwargs)
+        settings = {**self.CREATE_DEFAULTS, 'name': name, **kwargs}
         if not slug:
             slug = slugify(name)
-        return self.post('repositories', self.username, slug, json=default_settings)
+        return self.post('repositories', self.username, slug, json=settings)
 
     def update_project(self, key, slug=None, **kwargs):
         """Update a repository project on Bitbucket"""
@@ -44,29 +66,144 @@ class BitbucketStrategy(ServiceAPIStrategy):
 
     def delete_project(self, key, slug):
         """Safe-delete a repository project on Bitbucket"""
-        response = self.project_details(key)
+        response = self.project_details(key, max_age=0)
         response.raise_for_status()
-        project_details = response.json()
+        project_details = response_json(response)
 
         if project_details['name'] == slug:
             return self.delete('repositories', self.username, slug)
         return self.HTTP400_DELETION_REFUSED
 
-    def list_projects(self):
-        """Get a list of user's projects on Bitbucket"""
-        return self.get('repositories', self.username)
-
-    def project_details(self, key):
+    def list_projects(self, per_page=100, concurrency=None):
+        """Get a list of all user's projects on Bitbucket"""
+        params = {'pagelen': per_page}
+        first = self.get('repositories', self.username, params={**params, 'page': 1})
+        if not first.ok:
+            return first
+
+        last = total_pages(first)
+        if last is not None:
+            pages = self.get_pages('repositories', self.username, pages=range(2, last + 1),
+                                   params=params, concurrency=concurrency)
+        else:
+            pages = self.get_next_pages(next_page(first), next_page,
+                                        'repositories', self.username, params=params)
+        return join_pages([first, *pages], key='values')
+
+    def iter_projects(self, per_page=100):
+        """Yield all user's projects on Bitbucket one by one, while receiving them
+
+        Consume the iterator completely, or close it, to release the connection.
+        """
+        params = {'pagelen': min(per_page, self.MAX_PAGELEN)}
+        page = 1
+        while page:
+            count = 0
+            for project in self.get_items('repositories', self.username, prefix='values.item',
+                                          params={**params, 'page': page}):
+                count += 1
+                yield project
+            # the reference to the next page is part of the body, after the list
+            page = page + 1 if count == params['pagelen'] else None
+
+    def project_details(self, key, max_age=None):
         """Get details of a single project on Bitbucket"""
-        return self.get('repositories', self.username, key)
+        return self.get('repositories', self.username, key, max_age=max_age)
 
     def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
         """Create a new deploy key for a project on Bitbucket"""
         raise NotImplementedError("Not available on Bitbucket, we're sorry!")
 
+    def async_strategy(self, http2=False):
+        """Return an asynchronous strategy for Bitbucket with the same settings"""
+        strategy = AsyncBitbucketStrategy.from_strategy(self, http2)
+        strategy._username = self._username
+        return strategy
+
 
 class BitbucketAPI(ServiceAPI):
     """Bitbucket service API"""
+    __slots__ = ()
 
     def __init__(self, oauth_token):
         super().__init__(BitbucketStrategy(oauth_token))
+
+
+class AsyncBitbucketStrategy(AsyncServiceAPIStrategy):
+    """Asynchronous API bus implementation for accessing Bitbucket resources"""
+    __slots__ = ('_username', '_username_lock')
+
+    CREATE_DEFAULTS = BitbucketStrategy.CREATE_DEFAULTS
+
+    def __init__(self, oauth_token, http2=False):
+        """Asynchronous API access to the Bitbucket hosted service"""
+        super().__init__(base_url='https://api.bitbucket.org/2.0',
+                         oauth_token=oauth_token,
+                         http2=http2)
+        self._username = None
+        self._username_lock = asyncio.Lock()
+
+    async def username(self):
+        """Return the username of the Bitbucket account, querying the API only once"""
+        async with self._username_lock:
+            if self._username is None:
+                user_details = await self.get_json_or_raise('user')
+                self._username = user_details['username']
+        return self._username
+
+    async def create_project(self, name, slug=None, **kwargs):
+        """Create a repository project on Bitbucket"""
+        settings = {**self.CREATE_DEFAULTS, 'name': name, **kwargs}
+        if not slug:
+            slug = slugify(name)
+        return await self.post('repositories', await self.username(), slug,
+                               json=settings)
+
+    async def update_project(self, key, slug=None, **kwargs):
+        """Update a repository project on Bitbucket"""
+        mappings = {}
+        mappings.update(kwargs)
+        return await self.put('repositories', await self.username(), slug, json=mappings)
+
+    async def delete_project(self, key, slug):
+        """Safe-delete a repository project on Bitbucket"""
+        response = await self.project_details(key)
+        response.raise_for_status()
+        project_details = response_json(response)
+
+        if project_details['name'] == slug:
+            return await self.delete('repositories', await self.username(), slug)
+        return self.HTTP400_DELETION_REFUSED
+
+    async def list_projects(self, per_page=100, concurrency=None):
+        """Get a list of all user's projects on Bitbucket"""
+        username = await self.username()
+        params = {'pagelen': per_page}
+        first = await self.get('repositories', username, params={**params, 'page': 1})
+        if not first.ok:
+            return first
+
+        last = total_pages(first)
+        if last is not None:
+            pages = await self.get_pages('repositories', username, pages=range(2, last + 1),
+                                         params=params, concurrency=concurrency)
+        else:
+            pages = await self.get_next_pages(next_page(first), next_page,
+                                              'repositories', username, params=params)
+        return join_pages([first, *pages], key='values')
+
+    async def project_details(self, key):
+        """Get details of a single project on Bitbucket"""
+        return await self.get('repositories', await self.username(), key)
+
+    async def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
+        """Create a new deploy key for a project on Bitbucket"""
+        raise NotImplementedError("Not available on Bitbucket, we're sorry!")
+
+
+class AsyncBitbucketAPI(AsyncServiceAPI):
+    """Asynchronous Bitbucket service API"""
+    __slots__ = ()
+
+    def __init__(self, oauth_token):
+        super().__init__(AsyncBitbucketStrategy(oauth_token))
@@ -3,38 +3,79 @@ API access implementation for GitHub.
 
 See: https://developer.github.com/v3/
 """
-import json
+import asyncio
+from functools import lru_cache
 
-from django.template.defaultfilters import slugify
+from ._slug import slugify
+from .async_base import AsyncServiceAPI, AsyncServiceAPIStrategy
+from .base import (
+    ServiceAPI,
+    ServiceAPIStrategy,
+    dump_json,
+    join_pages,
+    page_of_url,
+    response_json,
+)
 
-from .base import ServiceAPI, ServiceAPIStrategy
+
+JSON_CONTENT = {'Content-Type': 'application/json'}
+
+
+@lru_cache(maxsize=64)
+def deploy_key_body(key_title, ssh_key, read_only=True):
+    """
+    Return the encoded JSON body for creating a deploy key on GitHub.  Adding
+    the same key to many projects thus encodes it only once.
+    """
+    payload = {
+        'title': key_title,
+        'key': ssh_key,
+        'read_only': read_only,
+    }
+    return dump_json(payload)
+
+
+def last_page(response):
+    """Return the number of the last page listed in a GitHub response"""
+    return page_of_url(response.links.get('last', {}).get('url')) or 1
+
+
+def next_page(response):
+    """Return the number of the page following a GitHub response, or None"""
+    return page_of_url(response.links.get('next', {}).get('url'))
 
 
 class GitHubStrategy(ServiceAPIStrategy):
     """API bus implementation for accessing GitHub resources"""
+    __slots__ = ('_username',)
 
-    def __init__(self, oauth_token):
+    CREATE_DEFAULTS = {
+        'has_issues': False,
+        'has_wiki': False,
+        'private': False,
+    }
+
+    def __init__(self, oauth_token, http2=False, pool_manager=False):
         """API access to the GitHub hosted service"""
         super().__init__(base_url='https://api.github.com',
                          headers={'Accept': 'application/vnd.github.v3+json'},
-                         oauth_token=oauth_token)
+                         oauth_token=oauth_token,
+                         http2=http2,
+                         pool_manager=pool_manager)
+        self._username = None
 
     @property
     def username(self):
-        """Yield the authenticated user by querying the API"""
-        user_details = self.get_json_or_raise('user')
-        return user_details['login']
+        """Return the authenticated user, querying the API only once"""
+        if self._username is None:
+            user_details = self.get_json_or_raise('user')
+            self._username = user_details['login']
+        return self._username
 
     def create_project(self, name, slug=None, **kwargs):
         """Create a repository project on GitHub"""
-        default_settings = {
-            'has_issues': False,
-            'has_wiki': False,
-            'name': slug if slug else slugify(name),
-            'private': False,
-        }
-        default_settings.update(kwargs)
-        return self.post('user', 'repos', json=default_settings)
+        settings = {**self.CREATE_DEFAULTS, 'name': slug if slug else slugify(name), **kwargs}
+        return self.post('user', 'repos', json=settings)
 
     def update_project(self, key, slug=None, **kwargs):
         """Update a repository project on GitHub"""
@@ -44,34 +85,131 @@ class GitHubStrategy(ServiceAPIStrategy):
 
     def delete_project(self, key, slug):
         """Safe-delete a repository project on GitHub"""
-        response = self.project_details(key)
+        response = self.project_details(key, max_age=0)
         response.raise_for_status()
-        project_details = response.json()
+        project_details = response_json(response)
 
         if project_details['path'] == slug:
             return self.delete('repos', self.username, key)
         return self.HTTP400_DELETION_REFUSED
 
-    def list_projects(self):
-        """Get a list of user's projects on GitHub"""
-        return self.get('user', 'repos')
-
-    def project_details(self, key):
+    def list_projects(self, per_page=100, concurrency=None):
+        """Get a list of all user's projects on GitHub"""
+        params = {'per_page': per_page}
+        first = self.get('user', 'repos', params={**params, 'page': 1})
+        if not first.ok:
+            return first
+
+        pages = self.get_pages('user', 'repos', pages=range(2, last_page(first) + 1),
+                               params=params, concurrency=concurrency)
+        return join_pages([first, *pages])
+
+    def iter_projects(self, per_page=100):
+        """Yield all user's projects on GitHub one by one, while receiving them
+
+        Consume the iterator completely, or close it, to release the connection.
+        """
+        params = {'per_page': per_page}
+        page = 1
+        while page:
+            response = yield from self.get_items('user', 'repos',
+                                                 params={**params, 'page': page})
+            page = next_page(response)
+
+    def project_details(self, key, max_age=None):
         """Get details of a single project on GitHub"""
-        return self.get('repos', self.username, key)
+        return self.get('repos', self.username, key, max_age=max_age)
 
     def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
         """Create a new deploy key for a project on GitHub"""
-        payload = {
-            'title': key_title,
-            'key': ssh_key,
-            'read_only': read_only,
-        }
-        return self.post('repos', self.username, project_id, 'keys', data=json.dumps(payload))
+        return self.post('repos', self.username, project_id, 'keys',
+                         data=deploy_key_body(key_title, ssh_key, read_only),
+                         headers=JSON_CONTENT)
+
+    def async_strategy(self, http2=False):
+        """Return an asynchronous strategy for GitHub with the same settings"""
+        strategy = AsyncGitHubStrategy.from_strategy(self, http2)
+        strategy._username = self._username
+        return strategy
 
 
 class GitHubAPI(ServiceAPI):
     """GitHub service API"""
+    __slots__ = ()
 
     def __init__(self, oauth_token):
         super().__init__(GitHubStrategy(oauth_token))
+
+
+class AsyncGitHubStrategy(AsyncServiceAPIStrategy):
+    """Asynchronous API bus implementation for accessing GitHub resources"""
+    __slots__ = ('_username', '_username_lock')
+
+    CREATE_DEFAULTS = GitHubStrategy.CREATE_DEFAULTS
+
+    def __init__(self, oauth_token, http2=False):
+        """Asynchronous API access to the GitHub hosted service"""
+        super().__init__(base_url='https://api.github.com',
+                         headers={'Accept': 'application/vnd.github.v3+json'},
+                         oauth_token=oauth_token,
+                         http2=http2)
+        self._username = None
+        self._username_lock = asyncio.Lock()
+
+    async def username(self):
+        """Return the authenticated user, querying the API only once"""
+        async with self._username_lock:
+            if self._username is None:
+                user_details = await self.get_json_or_raise('user')
+                self._username = user_details['login']
+        return self._username
+
+    async def create_project(self, name, slug=None, **kwargs):
+        """Create a repository project on GitHub"""
+        settings = {**self.CREATE_DEFAULTS, 'name': slug if slug else slugify(name), **kwargs}
+        return await self.post('user', 'repos', json=settings)
+
+    async def update_project(self, key, slug=None, **kwargs):
+        """Update a repository project on GitHub"""
+        mappings = {}
+        mappings.update(kwargs)
+        return await self.put('repos', await self.username(), key, json=mappings)
+
+    async def delete_project(self, key, slug):
+        """Safe-delete a repository project on GitHub"""
+        response = await self.project_details(key)
+        response.raise_for_status()
+        project_details = response_json(response)
+
+        if project_details['path'] == slug:
+            return await self.delete('repos', await self.username(), key)
+        return self.HTTP400_DELETION_REFUSED
+
+    async def list_projects(self, per_page=100, concurrency=None):
+        """Get a list of all user's projects on GitHub"""
+        params = {'per_page': per_page}
+        first = await self.get('user', 'repos', params={**params, 'page': 1})
+        if not first.ok:
+            return first
+
+        pages = await self.get_pages('user', 'repos', pages=range(2, last_page(first) + 1),
+                                     params=params, concurrency=concurrency)
+        return join_pages([first, *pages])
+
+    async def project_details(self, key):
+        """Get details of a single project on GitHub"""
+        return await self.get('repos', await self.username(), key)
+
+    async def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
+        """Create a new deploy key for a project on GitHub"""
+        return await self.post('repos', await self.username(), project_id, 'keys',
+                               data=deploy_key_body(key_title, ssh_key, read_only),
+                               headers=JSON_CONTENT)
+
+
+class AsyncGitHubAPI(AsyncServiceAPI):
+    """Asynchronous GitHub service API"""
+    __slots__ = ()
+
+    def __init__(self, oauth_token):
+        super().__init__(AsyncGitHubStrategy(oauth_token))
@@ -3,32 +3,41 @@ API access implementation for GitLab.
 
 See: https://docs.gitlab.com/ce/api/
 """
-from .base import ServiceAPI, ServiceAPIStrategy
+from .async_base import AsyncServiceAPI, AsyncServiceAPIStrategy
+from .base import ServiceAPI, ServiceAPIStrategy, join_pages, response_json
+
+
+def next_page(response):
+    """Return the number of the page following a GitLab response, or None"""
+    page = response.headers.get('X-Next-Page')
+    return int(page) if page else None
 
 
 class GitLabStrategy(ServiceAPIStrategy):
     """API bus implementation for accessing GitLab resources"""
+    __slots__ = ()
 
-    def __init__(self, oauth_token):
+    CREATE_DEFAULTS = {
+        'builds_enabled': True,
+        'issues_enabled': False,
+        'merge_requests_enabled': True,
+        'public': False,
+        'public_builds': False,
+        'snippets_enabled': False,
+        'wiki_enabled': False,
+    }
+
+    def __init__(self, oauth_token, http2=False, pool_manager=False):
         """API access to the GitLab hosted service"""
         super().__init__(base_url='https://gitlab.com/api/v4',
-                         oauth_token=oauth_token)
+                         oauth_token=oauth_token,
+                         http2=http2,
+                         pool_manager=pool_manager)
 
     def create_project(self, name, slug=None, **kwargs):
         """Create a repository project on GitLab"""
-        default_settings = {
-            'builds_enabled': True,
-            'issues_enabled': False,
-            'merge_requests_enabled': True,
-            'name': name,
-            'path': slug,
-            'public': False,
-            'public_builds': False,
-            'snippets_enabled': False,
-            'wiki_enabled': False,
-        }
-        default_settings.update(kwargs)
-        return self.post('projects', params=default_settings)
+        settings = {**self.CREATE_DEFAULTS, 'name': name, 'path': slug, **kwargs}
+        return self.post('projects', params=settings)
 
     def update_project(self, key, slug=None, **kwargs):
         """Update a repository project on GitLab"""
@@ -40,21 +49,44 @@ class GitLabStrategy(ServiceAPIStrategy):
 
     def delete_project(self, key, slug):
         """Safe-delete a repository project on GitLab"""
-        response = self.project_details(key)
+        response = self.project_details(key, max_age=0)
         response.raise_for_status()
-        project_details = response.json()
+        project_details = response_json(response)
 
         if project_details['path'] == slug:
             return self.delete('projects', key)
         return self.HTTP400_DELETION_REFUSED
 
-    def list_projects(self):
-        """Get a list of user's projects on GitLab"""
-        return self.get('projects')
+    def list_projects(self, per_page=100, concurrency=None):
+        """Get a list of all user's projects on GitLab"""
+        params = {'membership': True, 'per_page': per_page}
+        first = self.get('projects', params={**params, 'page': 1})
+        if not first.ok:
+            return first
 
-    def project_details(self, key):
+        total_pages = first.headers.get('X-Total-Pages')
+        if total_pages:
+            pages = self.get_pages('projects', pages=range(2, int(total_pages) + 1),
+                                   params=params, concurrency=concurrency)
+        else:  # omitted by GitLab for more than 10,000 projects
+            pages = self.get_next_pages(next_page(first), next_page, 'projects',
+                                        params=params)
+        return join_pages([first, *pages])
+
+    def iter_projects(self, per_page=100):
+        """Yield all user's projects on GitLab one by one, while receiving them
+
+        Consume the iterator completely, or close it, to release the connection.
+        """
+        params = {'membership': True, 'per_page': per_page}
+        page = 1
+        while page:
+            response = yield from self.get_items('projects', params={**params, 'page': page})
+            page = next_page(response)
+
+    def project_details(self, key, max_age=None):
         """Get details of a single project on GitLab"""
-        return self.get('projects', key)
+        return self.get('projects', key, max_age=max_age)
 
     def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
         """Create a new deploy key for a project on GitLab"""
@@ -66,9 +98,88 @@ class GitLabStrategy(ServiceAPIStrategy):
         }
         return self.post('projects', project_id, 'deploy_keys', params=payload)
 
+    def async_strategy(self, http2=False):
+        """Return an asynchronous strategy for GitLab with the same settings"""
+        return AsyncGitLabStrategy.from_strategy(self, http2)
+
 
 class GitLabAPI(ServiceAPI):
     """GitLab service API"""
+    __slots__ = ()
 
     def __init__(self, oauth_token):
         super().__init__(GitLabStrategy(oauth_token))
+
+
+class AsyncGitLabStrategy(AsyncServiceAPIStrategy):
+    """Asynchronous API bus implementation for accessing GitLab resources"""
+    __slots__ = ()
+
+    CREATE_DEFAULTS = GitLabStrategy.CREATE_DEFAULTS
+
+    def __init__(self, oauth_token, http2=False):
+        """Asynchronous API access to the GitLab hosted service"""
+        super().__init__(base_url='https://gitlab.com/api/v4',
+                         oauth_token=oauth_token,
+                         http2=http2)
+
+    async def create_project(self, name, slug=None, **kwargs):
+        """Create a repository project on GitLab"""
+        settings = {**self.CREATE_DEFAULTS, 'name': name, 'path': slug, **kwargs}
+        return await self.post('projects', params=settings)
+
+    async def update_project(self, key, slug=None, **kwargs):
+        """Update a repository project on GitLab"""
+        mappings = {
+            'path': slug,
+        }
+        mappings.update(kwargs)
+        return await self.put('projects', key, params=mappings)
+
+    async def delete_project(self, key, slug):
+        """Safe-delete a repository project on GitLab"""
+        response = await self.project_details(key)
+        response.raise_for_status()
+        project_details = response_json(response)
+
+        if project_details['path'] == slug:
+            return await self.delete('projects', key)
+        return self.HTTP400_DELETION_REFUSED
+
+    async def list_projects(self, per_page=100, concurrency=None):
+        """Get a list of all user's projects on GitLab"""
+        params = {'membership': True, 'per_page': per_page}
+        first = await self.get('projects', params={**params, 'page': 1})
+        if not first.ok:
+            return first
+
+        total_pages = first.headers.get('X-Total-Pages')
+        if total_pages:
+            pages = await self.get_pages('projects', pages=range(2, int(total_pages) + 1),
+                                         params=params, concurrency=concurrency)
+        else:  # omitted by GitLab for more than 10,000 projects
+            pages = await self.get_next_pages(next_page(first), next_page, 'projects',
+                                              params=params)
+        return join_pages([first, *pages])
+
+    async def project_details(self, key):
+        """Get details of a single project on GitLab"""
+        return await self.get('projects', key)
+
+    async def add_deploy_key(self, project_id, key_title, ssh_key, read_only=True):
+        """Create a new deploy key for a project on GitLab"""
+        payload = {
+            'id': project_id,
+            'title': key_title,
+            'key': ssh_key,
+            'can_push': not read_only,
+        }
+        return await self.post('projects', project_id, 'deploy_keys', params=payload)
+
+
+class AsyncGitLabAPI(AsyncServiceAPI):
+    """Asynchronous GitLab service API"""
+    __slots__ = ()
+
+    def __init__(self, oauth_token):
+        super().__init__(AsyncGitLabStrategy(oauth_token))